@@ -1,13 +1,16 @@
-from flask import Flask, url_for, render_template, current_app
+from flask import Flask, url_for, render_template, current_app, request, jsonify, abort
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from config import Config, ProdConfig
 from flask_migrate import Migrate
+from werkzeug.middleware.proxy_fix import ProxyFix
+from app.utils.replicas import RoutingSession, router as replica_router
+import hmac
 import unicodedata
 import re
 
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate(compare_type=True)
 login_manager = LoginManager()
 
@@ -21,6 +24,25 @@ def create_app(config_object = Config):
     app = Flask(__name__, static_folder='static', static_url_path='/')
     app.config.from_object(config_object)
 
+    # Detrás de nginx / un balanceador: PROXY_FIX_X_FOR = número de proxies de
+    # confianza delante de la app, para que request.remote_addr (límites de
+    # login, auditoría, /_metrics) sea la IP del cliente y no la del proxy.
+    # 0 (por defecto) no toca nada: X-Forwarded-* lo puede falsificar cualquiera.
+    proxy_fix = {key: app.config.get(f"PROXY_FIX_{key.upper()}", 0)
+                 for key in ("x_for", "x_proto", "x_host", "x_port", "x_prefix")}
+    if any(proxy_fix.values()):
+        app.wsgi_app = ProxyFix(app.wsgi_app, **proxy_fix)
+
+    # Caché de bytecode de Jinja en disco (antes de que se cree jinja_env)
+    from app.utils import templates
+    templates.configure(app)
+
+    # Pool de conexiones (DB_POOL_*) antes de que Flask-SQLAlchemy cree el engine
+    from app.utils.db_pool import engine_options, pool_stats
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app)
+    # Réplicas de lectura (SQLALCHEMY_REPLICA_URIS) como binds replica_<n>
+    replica_router.configure(app)
+
     db.init_app(app)
     migrate.init_app(app, db)
 
@@ -31,10 +53,40 @@ def create_app(config_object = Config):
     def landing():
         return render_template("landing.html", current_app = current_app)
 
-    # Exponer slugify a Jinja:
-    @app.context_processor
-    def inject_helpers():
-        return dict(slugify=slugify)
+    # Caché de páginas del catálogo público
+    from app.utils import metrics
+    from app.utils.cache import catalog_cache
+    catalog_cache.configure(
+        maxsize=app.config.get("CATALOG_CACHE_SIZE", 512),
+        ttl=app.config.get("CATALOG_CACHE_TTL", 60),
+    )
+    metrics.register("catalog_cache", catalog_cache.stats)
+    metrics.register("db_pool", lambda: pool_stats(db.engine))
+
+    # Instrumentación por petición (SQL, plantillas, Server-Timing, cProfile);
+    # antes que los blueprints para que su before_request corra primero
+    from app.utils import instrumentation
+    if instrumentation.init_app(app):
+        metrics.register("instrumentation", instrumentation.stats)
+
+    # Métricas internas: con METRICS_TOKEN se exige la cabecera X-Metrics-Token.
+    # Sin token el endpoint está cerrado, salvo METRICS_ALLOW_LOCAL=True, que
+    # abre solo las peticiones locales (detrás de un proxy en la misma máquina
+    # todas lo parecen: usar token en producción).
+    @app.route("/_metrics")
+    def internal_metrics():
+        token = app.config.get("METRICS_TOKEN")
+        if token:
+            if not hmac.compare_digest(request.headers.get("X-Metrics-Token", ""), token):
+                abort(404)
+        elif not (app.config.get("METRICS_ALLOW_LOCAL", False)
+                  and request.remote_addr in ("127.0.0.1", "::1")):
+            abort(404)
+        return jsonify(metrics.collect())
+
+    # Lecturas del catálogo público en réplicas, con read-your-writes
+    replica_router.init_app(app, db)
+    metrics.register("replicas", replica_router.stats)
 
     # Registrar Blueprints
     from app.routes import auth, dashboard, public
@@ -42,21 +94,84 @@ def create_app(config_object = Config):
     app.register_blueprint(dashboard.bp)
     app.register_blueprint(public.bp)
 
-    # user loader
-    from app.models import User
-    @login_manager.user_loader
-    def load_user(user_id):
-        return User.query.get(int(user_id))
-
-    def image_url(rel_path):
-        # Si ya es una URL externa, la devolvemos tal cual
+    # Auditoría (tabla logs) con escritura diferida en lotes
+    from app.utils.audit import audit
+    audit.init_app(app)
+    metrics.register("audit", audit.stats)
+
+    # Tiendas por Host: acme.<TENANT_BASE_DOMAIN>/ sirve el catálogo de "acme"
+    from app.utils.tenants import tenant_map, subdomain_from_host
+    metrics.register("tenants", tenant_map.stats)
+
+    @app.before_request
+    def resolve_tenant_host():
+        if request.path != "/":
+            return None
+        sub = subdomain_from_host(request.host, app.config.get("TENANT_BASE_DOMAIN"))
+        if sub is None:
+            return None
+        if request.method in ("GET", "HEAD"):
+            replica_router.route_to_replica()
+        return public.store_catalog(sub)
+
+    # Descuentos programados: hilo opcional que arranca con la primera petición de
+    # cada worker (si no, `flask apply-discounts` por cron)
+    from app.utils.pricing import discount_scheduler
+    discount_scheduler.init_app(app)
+    metrics.register("discounts", discount_scheduler.stats)
+
+    from app.utils.validators import availability_cache
+    metrics.register("subdomain_availability", availability_cache.stats)
+
+    # Hash de contraseñas en un pool de procesos acotado
+    from app.utils.passwords import hasher
+    hasher.init_app(app)
+    metrics.register("password_hasher", hasher.stats)
+
+    # Límite de intentos de login/registro por IP y por email
+    from app.utils.ratelimit import limiter
+    limiter.init_app(app)
+    metrics.register("rate_limit", limiter.stats)
+
+    # Borrado de imágenes después del commit (y `flask uploads sweep` para huérfanas)
+    from app.utils.upload_gc import deleter
+    deleter.init_app(app)
+    metrics.register("uploads", deleter.stats)
+
+    # Estáticos con huella (si existe static/dist/manifest.json; ver `flask assets build`)
+    from app.utils import assets
+    assets.init_app(app)
+
+    # Comandos de consola (flask bench ...)
+    from app.commands import register_commands
+    register_commands(app)
+
+    # user loader: copia liviana del usuario cacheada por proceso
+    from app.utils import user_cache
+    user_cache.init_app(app)
+    login_manager.user_loader(user_cache.load_user)
+    metrics.register("user_cache", user_cache.user_cache.stats)
+
+    # Imágenes externas: se sirven desde /_img (descarga única, redimensionada y cacheada en disco)
+    from app.utils.image_proxy import image_proxy
+    image_proxy.init_app(app)
+    metrics.register("image_proxy", image_proxy.stats)
+
+    def image_url(rel_path, width=None):
+        # URL externa: por el proxy si está activo, si no tal cual
         if rel_path.startswith("http://") or rel_path.startswith("https://"):
-            return rel_path
+            return image_proxy.url_for(rel_path, width) if image_proxy.enabled else rel_path
         return url_for('static', filename=rel_path)
 
+    from app.utils.images import image_srcset, image_thumb
+
+    # Helpers de plantillas: el dict se arma una vez, no en cada render
+    helpers = dict(slugify=slugify, image_url=image_url,
+                   image_srcset=image_srcset, image_thumb=image_thumb)
+
     @app.context_processor
     def inject_helpers():
-        return dict(slugify=slugify, image_url=image_url)
+        return helpers
 
     def digits_filter(s):
         return re.sub(r'\D+', '', s or '')
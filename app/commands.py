@@ -0,0 +1,570 @@
+"""
+Comandos de consola (`flask <comando>`) para mantenimiento y benchmarks.
+"""
+import os
+import random
+import statistics
+import time
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import case, insert
+
+from app import db
+
+bench_cli = AppGroup('bench', help='Benchmarks de rutas y consultas.')
+templates_cli = AppGroup('templates', help='Plantillas Jinja.')
+assets_cli = AppGroup('assets', help='Estáticos con huella y precomprimidos.')
+uploads_cli = AppGroup('uploads', help='Imágenes subidas por las tiendas.')
+
+_WORDS = (
+    "zapato camisa pantalon bolso reloj gorra chaqueta vestido falda media "
+    "cuero algodon lana seda rojo azul verde negro blanco gris talla grande "
+    "pequeno deportivo elegante casual oferta nuevo clasico moderno premium"
+).split()
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = max(0, min(len(values) - 1, int(round(pct / 100 * (len(values) - 1)))))
+    return values[k]
+
+
+def _report(label, timings):
+    click.echo(
+        f"{label:<16} n={len(timings):<5} "
+        f"mean={statistics.mean(timings) * 1000:8.2f}ms "
+        f"p50={_percentile(timings, 50) * 1000:8.2f}ms "
+        f"p95={_percentile(timings, 95) * 1000:8.2f}ms"
+    )
+
+
+@bench_cli.command('search')
+@click.option('--products', default=20000, show_default=True, help='Productos a sembrar en la tienda temporal.')
+@click.option('--queries', default=200, show_default=True, help='Búsquedas a ejecutar por estrategia.')
+@click.option('--seed', default=42, show_default=True)
+def bench_search(products, queries, seed):
+    """Compara la búsqueda ILIKE contra el índice invertido.
+
+    Ambas pasan por _catalog_query con el orden y la paginación del catálogo
+    (primera página de 24). Siembra una tienda temporal dentro de una transacción que se revierte al final.
+    """
+    from app.models import User, Product
+    from app.routes.public import SORT_KEYS, _catalog_query
+    from app.utils.pagination import keyset_paginate, offset_paginate
+    from app.utils.search import search_index
+
+    rnd = random.Random(seed)
+    user = User(username='bench', userlastname='bench', email=f'bench-{seed}@bench.local',
+                password='x', store_name='Bench', store_address='-', celphone='0',
+                subdomain=f'bench-{seed}', country='-', city='-')
+    db.session.add(user)
+    db.session.flush()
+
+    rows = [
+        dict(user_id=user.id,
+             name=' '.join(rnd.choices(_WORDS, k=3)),
+             description=' '.join(rnd.choices(_WORDS, k=12)),
+             price=rnd.randint(1, 500),
+             status='available')
+        for _ in range(products)
+    ]
+    for row in rows:
+        row['effective_price'] = row['price']
+    for i in range(0, len(rows), 1000):
+        db.session.execute(insert(Product), rows[i:i + 1000])
+    db.session.flush()
+
+    terms = [rnd.choice(_WORDS)[:rnd.randint(3, 6)] for _ in range(queries)]
+
+    def timed(sort, use_index):
+        # El camino real del catálogo: filtro, orden y primera página de 24
+        times = []
+        for term in terms:
+            t0 = time.perf_counter()
+            q, effective_sort, ranking = _catalog_query(user.id, term, sort, use_index=use_index)
+            if effective_sort == 'relevance':
+                q = q.order_by(case(ranking, value=Product.id), Product.id.desc())
+                offset_paginate(q, 1, 24)
+            else:
+                keyset_paginate(q, SORT_KEYS[effective_sort], 24)
+            times.append(time.perf_counter() - t0)
+        return times
+
+    try:
+        search_index.invalidate_store(user.id)
+        t0 = time.perf_counter()
+        search_index.search(user.id, 'warmup')
+        build_time = time.perf_counter() - t0
+
+        click.echo(f"{products} productos, {queries} búsquedas")
+        click.echo(f"construcción del índice: {build_time * 1000:.1f}ms")
+        for sort in ('new', 'price_asc'):
+            _report(f'ilike/{sort}', timed(sort, use_index=False))
+            _report(f'index/{sort}', timed(sort, use_index=True))
+        _report('index/relevance', timed('relevance', use_index=True))
+    finally:
+        search_index.invalidate_store(user.id)
+        db.session.rollback()
+
+
+# ---------- Carga sintética y benchmark de rutas ----------
+_BENCH_DOMAIN = '@bench.example'  # .local no pasa el validador de email del formulario
+_PLATFORMS = ('facebook', 'instagram', 'tiktok', 'whatsapp', 'website')
+
+
+def _bench_user_ids():
+    from app.models import User
+    return [uid for (uid,) in db.session.query(User.id).filter(User.email.like(f'%{_BENCH_DOMAIN}'))]
+
+
+def _delete_bench_data():
+    from app.models import User, Product, SocialMedia, StoreStats, Log
+
+    ids = _bench_user_ids()
+    for i in range(0, len(ids), 1000):
+        chunk = ids[i:i + 1000]
+        for model in (Product, SocialMedia, StoreStats, Log):
+            db.session.query(model).filter(model.user_id.in_(chunk)).delete(synchronize_session=False)
+        db.session.query(User).filter(User.id.in_(chunk)).delete(synchronize_session=False)
+        db.session.commit()
+    return len(ids)
+
+
+@bench_cli.command('seed')
+@click.option('--stores', default=1000, show_default=True)
+@click.option('--products-per-store', default=100, show_default=True)
+@click.option('--social-per-store', default=3, show_default=True)
+@click.option('--password', default='bench1234', show_default=True, help='Contraseña de todas las tiendas sembradas.')
+@click.option('--batch-size', default=5000, show_default=True)
+@click.option('--seed', default=42, show_default=True)
+@click.option('--reset', is_flag=True, help='Borra antes los datos sembrados por una corrida anterior.')
+def bench_seed(stores, products_per_store, social_per_store, password, batch_size, seed, reset):
+    """Siembra tiendas, productos y redes sociales (emails *@bench.example).
+
+    Los datos se confirman; se borran con `flask bench seed --reset --stores 0`.
+    """
+    from datetime import datetime, timedelta
+    from app.models import User, Product, SocialMedia
+    from app.utils import store_stats
+    from app.utils.passwords import hasher
+
+    if reset:
+        click.echo(f"{_delete_bench_data()} tiendas de benchmark borradas")
+    elif _bench_user_ids():
+        raise click.UsageError("Ya hay datos de benchmark; usa --reset para reemplazarlos.")
+    if not stores:
+        return
+
+    rnd = random.Random(seed)
+    pwhash = hasher.hash(password)
+    now = datetime.now().replace(microsecond=0)
+    t0 = time.perf_counter()
+
+    users = [
+        dict(username=f'Bench{i}', userlastname='Bench', email=f'store{i}{_BENCH_DOMAIN}',
+             password=pwhash, store_name=f'Tienda {i}', store_address='-', celphone='70000000',
+             subdomain=f'bench-{i}', country='BO', city='LP', status='active')
+        for i in range(stores)
+    ]
+    for i in range(0, len(users), batch_size):
+        db.session.execute(insert(User), users[i:i + batch_size])
+    db.session.commit()
+    ids = sorted(_bench_user_ids())
+
+    batch, n_products = [], 0
+    for uid in ids:
+        for _ in range(products_per_store):
+            price = rnd.randint(100, 50000) / 100
+            original = round(price * rnd.uniform(1.1, 1.6), 2) if rnd.random() < 0.2 else None
+            batch.append(dict(
+                user_id=uid,
+                name=' '.join(rnd.choices(_WORDS, k=3)),
+                description=' '.join(rnd.choices(_WORDS, k=12)),
+                price=price,
+                original_price=original,
+                effective_price=price,
+                status='available' if rnd.random() < 0.9 else 'unavailable',
+                created_at=now - timedelta(seconds=rnd.randint(0, 365 * 86400)),
+            ))
+            if len(batch) >= batch_size:
+                db.session.execute(insert(Product), batch)
+                db.session.commit()
+                n_products += len(batch)
+                batch = []
+    if batch:
+        db.session.execute(insert(Product), batch)
+        n_products += len(batch)
+
+    social = [
+        dict(user_id=uid, platform=platform, url=f'https://{platform}.example/{uid}')
+        for uid in ids
+        for platform in rnd.sample(_PLATFORMS, k=min(social_per_store, len(_PLATFORMS)))
+    ]
+    for i in range(0, len(social), batch_size):
+        db.session.execute(insert(SocialMedia), social[i:i + batch_size])
+
+    store_stats.reconcile(ids)
+    db.session.commit()
+    click.echo(f"{len(ids)} tiendas, {n_products} productos, {len(social)} redes "
+               f"en {time.perf_counter() - t0:.1f}s")
+
+
+def _deep_cursors(client, stores, pages):
+    """(subdominio, args) de la página `pages` de cada tienda, siguiendo los cursores."""
+    out = []
+    for sub in stores:
+        args = {}
+        for _ in range(pages - 1):
+            resp = client.get(f'/public/{sub}/products.json', query_string={**args, 'fields': 'id'})
+            nxt = resp.get_json()['meta']['next'] if resp.status_code == 200 else None
+            if not nxt:
+                break
+            args = nxt
+        out.append((sub, args))
+    return out
+
+
+def _scenarios(stores, deep, rnd):
+    """Genera (nombre, función(client) -> response, status esperado) para cada escenario."""
+    def catalog(sort, q=''):
+        def run(client):
+            sub = rnd.choice(stores)
+            return client.get(f'/public/{sub}', query_string={'sort': sort, 'q': q})
+        return run
+
+    def search(client):
+        return client.get(f'/public/{rnd.choice(stores)}',
+                          query_string={'q': rnd.choice(_WORDS)[:4], 'sort': 'relevance'})
+
+    def deep_page(client):
+        sub, args = rnd.choice(deep)
+        return client.get(f'/public/{sub}', query_string=args)
+
+    def api(client):
+        return client.get(f'/public/{rnd.choice(stores)}/products.json',
+                          query_string={'fields': 'id,name,price', 'per_page': 50})
+
+    return [
+        ('catalog_new', catalog('new'), 200),
+        ('catalog_price_asc', catalog('price_asc'), 200),
+        ('catalog_price_desc', catalog('price_desc'), 200),
+        ('catalog_search', search, 200),
+        ('catalog_deep', deep_page, 200),
+        ('catalog_json', api, 200),
+    ]
+
+
+def _summary(timings, statuses, expected):
+    total = sum(timings)
+    return {
+        'n': len(timings),
+        'errors': sum(1 for s in statuses if s != expected),
+        'rps': round(len(timings) / total, 1) if total else 0.0,
+        'mean_ms': round(statistics.mean(timings) * 1000, 2) if timings else 0.0,
+        'p50_ms': round(_percentile(timings, 50) * 1000, 2),
+        'p95_ms': round(_percentile(timings, 95) * 1000, 2),
+        'p99_ms': round(_percentile(timings, 99) * 1000, 2),
+    }
+
+
+def _git_revision():
+    import subprocess
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, timeout=5, check=True).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _without_app_context(fn):
+    """
+    Ejecuta fn en otro hilo, sin el app context que empuja la CLI: si no, todas
+    las peticiones del cliente de pruebas comparten `g` (y con él el usuario de
+    Flask-Login) y la misma sesión de SQLAlchemy.
+    """
+    import threading
+
+    outcome = {}
+
+    def target():
+        try:
+            outcome['result'] = fn()
+        except BaseException as exc:
+            outcome['error'] = exc
+
+    thread = threading.Thread(target=target, name='bench-run')
+    thread.start()
+    thread.join()
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['result']
+
+
+@bench_cli.command('run')
+@click.option('--requests', 'n', default=200, show_default=True, help='Peticiones por escenario.')
+@click.option('--deep-page', default=20, show_default=True, help='Página que pide catalog_deep (vía cursores).')
+@click.option('--only', multiple=True, help='Escenarios a correr (repetible); por defecto todos.')
+@click.option('--cache/--no-cache', default=False, show_default=True,
+              help='Con --no-cache se vacía la caché del catálogo antes de cada petición.')
+@click.option('--password', default='bench1234', show_default=True)
+@click.option('--output', type=click.Path(dir_okay=False), default=None, help='Guarda los resultados en JSON.')
+@click.option('--label', default=None, help='Etiqueta de la corrida (por defecto, el commit actual).')
+@click.option('--seed', default=42, show_default=True)
+def bench_run(n, deep_page, only, cache, password, output, label, seed):
+    """Mide latencia (p50/p95/p99) y throughput de las rutas principales.
+
+    Requiere `flask bench seed`. Usa el cliente de pruebas de Flask (sin red),
+    desactiva CSRF y el límite de intentos mientras corre, y las altas de
+    `auth_register` quedan como tiendas de benchmark.
+    """
+    import json
+    import platform
+    from datetime import datetime
+    from flask import current_app
+    from app.models import User
+    from app.utils.cache import catalog_cache
+    from app.utils.ratelimit import limiter
+
+    app = current_app._get_current_object()
+    ids = _bench_user_ids()
+    if not ids:
+        raise click.UsageError("No hay datos de benchmark; corre antes `flask bench seed`.")
+    stores = [s for (s,) in db.session.query(User.subdomain).filter(User.id.in_(ids[:5000]))]
+    emails = [e for (e,) in db.session.query(User.email).filter(User.id.in_(ids[:5000]))]
+    db.session.remove()
+
+    rnd = random.Random(seed)
+    app.config['WTF_CSRF_ENABLED'] = False
+    limiter_enabled, limiter.enabled = limiter.enabled, False
+
+    def measure():
+        # catalog_deep pide directamente la página N; los cursores se calculan antes de medir
+        deep = _deep_cursors(app.test_client(), rnd.sample(stores, min(20, len(stores))), deep_page)
+        scenarios = _scenarios(stores, deep, rnd)
+
+        dash_client = app.test_client()
+        dash_client.post('/auth/login', data={'email': emails[0], 'password': password})
+        scenarios.append(('dashboard_index', lambda client: dash_client.get('/dashboard/'), 200))
+
+        def login(client):
+            # Cliente nuevo: con la sesión ya iniciada /auth/login redirige sin verificar
+            return app.test_client().post('/auth/login', data={'email': rnd.choice(emails), 'password': password})
+
+        serial = iter(range(10 ** 9))
+
+        def register(client):
+            i = next(serial)
+            tag = f'{seed}-{int(time.time())}-{i}'
+            return client.post('/auth/register', data=dict(
+                username='Bench', userlastname='Bench', email=f'reg-{tag}{_BENCH_DOMAIN}',
+                password=password, confirm_password=password, store_name='Bench',
+                store_address='-', celphone='70000000', subdomain=f'reg-{tag}',
+                country='BO', city='LP'))
+
+        scenarios += [('auth_login', login, 302), ('auth_register', register, 302)]
+        if only:
+            scenarios = [s for s in scenarios if s[0] in only]
+
+        results = {}
+        for name, fn, expected in scenarios:
+            client = app.test_client()
+            timings, statuses = [], []
+            for _ in range(n):
+                if not cache:
+                    catalog_cache.clear()
+                t0 = time.perf_counter()
+                resp = fn(client)
+                timings.append(time.perf_counter() - t0)
+                statuses.append(resp.status_code)
+                resp.close()
+            results[name] = _summary(timings, statuses, expected)
+            r = results[name]
+            click.echo(f"{name:<20} n={r['n']:<5} err={r['errors']:<3} {r['rps']:8.1f} req/s "
+                       f"p50={r['p50_ms']:8.2f}ms p95={r['p95_ms']:8.2f}ms p99={r['p99_ms']:8.2f}ms")
+        return results
+
+    try:
+        results = _without_app_context(measure)
+    finally:
+        limiter.enabled = limiter_enabled
+
+    if output:
+        revision = _git_revision()
+        report = {
+            'label': label or revision,
+            'revision': revision,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'database': db.engine.dialect.name,
+            'stores': len(ids),
+            'requests': n,
+            'cache': cache,
+            'scenarios': results,
+        }
+        with open(output, 'w', encoding='utf-8') as fh:
+            json.dump(report, fh, indent=2)
+        click.echo(f"resultados guardados en {output}")
+
+
+@bench_cli.command('compare')
+@click.argument('baseline', type=click.File('r'))
+@click.argument('candidate', type=click.File('r'))
+@click.option('--metric', default='p95_ms', show_default=True,
+              type=click.Choice(['mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'rps']))
+def bench_compare(baseline, candidate, metric):
+    """Compara dos resultados de `flask bench run --output`."""
+    import json
+
+    base, cand = json.load(baseline), json.load(candidate)
+    click.echo(f"{metric}: {base.get('label')} -> {cand.get('label')}")
+    names = list(base['scenarios']) + [n for n in cand['scenarios'] if n not in base['scenarios']]
+    for name in names:
+        old = base['scenarios'].get(name, {}).get(metric)
+        new = cand['scenarios'].get(name, {}).get(metric)
+        if old is None or new is None:
+            click.echo(f"{name:<20} {'-' if old is None else old:>10} -> {'-' if new is None else new:>10}")
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        click.echo(f"{name:<20} {old:10.2f} -> {new:10.2f}  ({change:+6.1f}%)")
+
+
+# ---------- Contadores por tienda ----------
+@click.command('reconcile-store-stats')
+@click.option('--batch-size', default=1000, show_default=True)
+def reconcile_store_stats(batch_size):
+    """Recalcula los contadores de productos de todas las tiendas."""
+    from app.utils import store_stats
+
+    t0 = time.perf_counter()
+    n = store_stats.reconcile(batch_size=batch_size)
+    db.session.commit()
+    click.echo(f"{n} tiendas recalculadas en {time.perf_counter() - t0:.2f}s")
+
+
+# ---------- Descuentos programados ----------
+@click.command('apply-discounts')
+@click.option('--date', 'day', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Día a aplicar (por defecto hoy).')
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Último día ya aplicado, para recuperar días sin pasada (por defecto ayer).')
+@click.option('--full', is_flag=True, help='Revisa todas las ventanas de descuento, no solo las del día.')
+@click.option('--batch-size', default=1000, show_default=True)
+def apply_discounts(day, since, full, batch_size):
+    """Activa/desactiva los descuentos cuya ventana empieza o termina hoy.
+
+    Pensado para cron justo después de medianoche; es idempotente.
+    """
+    from app.utils import pricing
+
+    t0 = time.perf_counter()
+    changed, stores = pricing.apply_discounts(day.date() if day else None, batch_size=batch_size,
+                                              since=since.date() if since else None, full=full)
+    click.echo(f"{changed} productos actualizados en {len(stores)} tiendas "
+               f"({time.perf_counter() - t0:.2f}s)")
+
+
+# ---------- Subidas ----------
+@uploads_cli.command('sweep')
+@click.option('--dry-run', is_flag=True, help='Solo informa qué se borraría.')
+@click.option('--min-age', type=int, default=None,
+              help='Segundos sin modificar para considerar basura (por defecto UPLOAD_GC_MIN_AGE).')
+@click.option('--batch-size', default=200, show_default=True, help='Usuarios por consulta.')
+def uploads_sweep(dry_run, min_age, batch_size):
+    """Borra de uploads/ los archivos que ningún producto referencia.
+
+    Pensado para cron (ej. una vez por noche); es idempotente.
+    """
+    from flask import current_app
+    from app.utils import upload_gc
+
+    t0 = time.perf_counter()
+    r = upload_gc.sweep(current_app, dry_run=dry_run, min_age=min_age, batch_size=batch_size)
+    verb = 'se borrarían' if dry_run else 'borrados'
+    click.echo(f"{r['users']} carpetas, {r['files']} archivos revisados; {r['orphans']} huérfanos {verb} "
+               f"({r['reclaimed_bytes'] / 1024:.1f} KiB), {r['recent']} recientes omitidos, "
+               f"{r['errors']} errores ({time.perf_counter() - t0:.2f}s)")
+
+
+# ---------- Estáticos ----------
+@assets_cli.command('build')
+def assets_build():
+    """Genera static/dist/ (huella + .gz/.br) y su manifest.json."""
+    from flask import current_app
+    from app.utils import assets
+
+    t0 = time.perf_counter()
+    manifest = assets.build(current_app.static_folder)
+    dist = os.path.join(current_app.static_folder, assets.DIST)
+    compressed = sum(1 for _root, _dirs, files in os.walk(dist) for f in files if f.endswith(('.gz', '.br')))
+    click.echo(f"{len(manifest)} archivos, {compressed} variantes comprimidas en {time.perf_counter() - t0:.1f}s")
+    if assets.brotli is None:
+        click.echo("Aviso: falta el paquete brotli, no se generaron variantes .br "
+                   "(los navegadores recibirán gzip). pip install brotli", err=True)
+
+
+# ---------- Plantillas y arranque ----------
+@templates_cli.command('compile')
+def templates_compile():
+    """Compila todas las plantillas y llena la caché de bytecode en disco."""
+    from flask import current_app
+    from app.utils import templates
+
+    count, elapsed = templates.precompile(current_app)
+    cache = current_app.jinja_env.bytecode_cache
+    where = getattr(cache, 'directory', None) or 'sin caché en disco'
+    click.echo(f"{count} plantillas compiladas en {elapsed * 1000:.0f}ms ({where})")
+
+
+_STARTUP_SCRIPT = '''
+import json, sys, time
+t0 = time.perf_counter()
+import app as package
+import config
+t1 = time.perf_counter()
+application = package.create_app(getattr(config, sys.argv[1]))
+t2 = time.perf_counter()
+client = application.test_client()
+first = client.get(sys.argv[2])
+t3 = time.perf_counter()
+client.get(sys.argv[2])
+t4 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "factory_ms": (t2 - t1) * 1000,
+                  "first_request_ms": (t3 - t2) * 1000, "second_request_ms": (t4 - t3) * 1000,
+                  "status": first.status_code}))
+'''
+
+
+@click.command('startup-time')
+@click.option('--config', 'config_name', default='ProdConfig', show_default=True, help='Clase de config.py.')
+@click.option('--path', default='/auth/login', show_default=True, help='Ruta de la primera petición.')
+@click.option('--runs', default=3, show_default=True)
+def startup_time(config_name, path, runs):
+    """Mide import, create_app y la primera petición en procesos nuevos."""
+    import json
+    import subprocess
+    import sys
+    from flask import current_app
+
+    cwd = os.path.dirname(current_app.root_path)
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', _STARTUP_SCRIPT, config_name, path],
+                             cwd=cwd, capture_output=True, text=True, check=True)
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    for key in ('import_ms', 'factory_ms', 'first_request_ms', 'second_request_ms'):
+        values = [s[key] for s in samples]
+        click.echo(f"{key:<18} min={min(values):8.1f}  mediana={statistics.median(values):8.1f}")
+    click.echo(f"status {samples[-1]['status']} en {path}")
+
+
+def register_commands(app):
+    app.cli.add_command(bench_cli)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(uploads_cli)
+    app.cli.add_command(templates_cli)
+    app.cli.add_command(startup_time)
+    app.cli.add_command(reconcile_store_stats)
+    app.cli.add_command(apply_discounts)
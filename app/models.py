@@ -1,5 +1,16 @@
 from app import db
 from flask_login import UserMixin
+from sqlalchemy.dialects import sqlite
+
+
+# Marca de tiempo sin microsegundos también en SQLite, para que los valores
+# guardados por CURRENT_TIMESTAMP y los enviados como parámetro se comparen
+# igual (necesario para los cursores de paginación).
+Timestamp = db.DateTime().with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d "
+                                   "%(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite",
+)
 
 
 # === USUARIO ===
@@ -20,6 +31,9 @@ class User(UserMixin, db.Model):
     status = db.Column(db.Enum('active', 'inactive'), default='active')
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+    # Sube con cada cambio visible en el catálogo público (ver store_stats.touch);
+    # los timestamps tienen resolución de segundos y no alcanzan para el ETag
+    catalog_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     # Relaciones
     products = db.relationship('Product', backref='owner', cascade='all, delete-orphan')
@@ -36,6 +50,19 @@ class User(UserMixin, db.Model):
 # === PRODUCTOS ===
 class Product(db.Model):
     __tablename__ = 'products'
+    __table_args__ = (
+        # Catálogo público (sort=new) y conteos por estado del dashboard
+        db.Index('ix_products_user_status_created', 'user_id', 'status', 'created_at', 'id'),
+        # Catálogo público ordenado por precio vigente
+        db.Index('ix_products_user_status_effective', 'user_id', 'status', 'effective_price', 'created_at', 'id'),
+        # Listado del dashboard (todas las del dueño, más nuevas primero)
+        db.Index('ix_products_user_created', 'user_id', 'created_at', 'id'),
+        # Validador de caché HTTP (max(updated_at) por tienda)
+        db.Index('ix_products_user_updated', 'user_id', 'updated_at'),
+        # apply_discounts: ventanas que abren o cierran en un día dado
+        db.Index('ix_products_discount_start', 'discount_start'),
+        db.Index('ix_products_discount_end', 'discount_end'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete='CASCADE'), nullable=False)
@@ -45,15 +72,35 @@ class Product(db.Model):
     original_price = db.Column(db.Numeric(10, 2), default=None)
     discount_start = db.Column(db.Date, default=None)
     discount_end = db.Column(db.Date, default=None)
+    # price u original_price según la ventana de descuento (ver app/utils/pricing.py)
+    effective_price = db.Column(db.Numeric(10, 2), nullable=False)
     image_url = db.Column(db.String(255))
+    # {"webp": {"320": "uploads/..."}, "jpg": {...}}; se llena en segundo plano
+    image_variants = db.Column(db.JSON, default=None)
     status = db.Column(db.Enum('available', 'unavailable'), default='available')
-    created_at = db.Column(db.DateTime, server_default=db.func.now())
-    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+    created_at = db.Column(Timestamp, server_default=db.func.now())
+    updated_at = db.Column(Timestamp, server_default=db.func.now(), onupdate=db.func.now())
 
     def __repr__(self):
         return f'<Product {self.name}>'
 
 
+# === CONTADORES POR TIENDA ===
+class StoreStats(db.Model):
+    """Conteos de productos por tienda, mantenidos al crear/editar/eliminar."""
+    __tablename__ = 'store_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete='CASCADE'), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    available = db.Column(db.Integer, nullable=False, default=0)
+    unavailable = db.Column(db.Integer, nullable=False, default=0)
+    on_discount = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+
+    def __repr__(self):
+        return f'<StoreStats {self.user_id}: {self.total}>'
+
+
 # === REDES SOCIALES ===
 class SocialMedia(db.Model):
     __tablename__ = 'socialmedia'
@@ -76,6 +123,9 @@ class SocialMedia(db.Model):
 # === LOG DE ACCIONES ===
 class Log(db.Model):
     __tablename__ = 'logs'
+    __table_args__ = (
+        db.Index('ix_logs_user_created', 'user_id', 'created_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete='CASCADE'), nullable=False)
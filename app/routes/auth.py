@@ -1,37 +1,36 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, make_response
 from app.forms import LoginForm, RegisterForm
-from app.models import User
+from app.models import User, StoreStats
 from app import db, slugify  # usamos tu slugify del __init__.py
+from app.utils.audit import audit
+from app.utils.passwords import hasher, HasherBusy
+from app.utils.ratelimit import limiter
+from app.utils.tenants import tenant_map
+from app.utils.validators import (normalize_email, email_exists, subdomain_exists,
+                                  suggest_subdomains, subdomain_availability, availability_cache)
 from flask_login import login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy.exc import IntegrityError
 
 bp = Blueprint('auth', __name__, url_prefix='/auth')
 
 
-def normalize_email(email: str) -> str:
-    return (email or "").strip().lower()
+def _too_many_attempts(template: str, retry_after: int, **context):
+    flash(f'Demasiados intentos. Espera {retry_after} s y vuelve a intentar.', 'warning')
+    resp = make_response(render_template(template, **context), 429)
+    resp.headers['Retry-After'] = str(retry_after)
+    return resp
 
 
-def email_exists(email: str) -> bool:
-    return db.session.query(User.query.filter_by(email=email).exists()).scalar()
-
-
-def subdomain_exists(subdomain: str) -> bool:
-    return db.session.query(User.query.filter_by(subdomain=subdomain).exists()).scalar()
-
-
-def suggest_subdomains(base: str, k: int = 3):
-    """Devuelve k sugerencias disponibles a partir del slug base."""
-    base = slugify(base) or "tienda"
-    out = []
-    i = 2
-    while len(out) < k:
-        candidate = f"{base}-{i}"
-        if not subdomain_exists(candidate):
-            out.append(candidate)
-        i += 1
-    return out
+def _rehash_if_needed(user, password: str):
+    """Actualiza el hash si PASSWORD_HASH_METHOD cambió; si el pool está ocupado, será otro día."""
+    try:
+        if not hasher.needs_rehash(user.password):
+            return
+        user.password = hasher.hash(password)
+        db.session.commit()
+        hasher.record_rehash()
+    except HasherBusy:
+        db.session.rollback()
 
 
 @bp.route('/login', methods=['GET', 'POST'])
@@ -40,14 +39,31 @@ def login():
         return redirect(url_for('dashboard.index'))
 
     form = LoginForm()
+    # Límites antes de cualquier consulta o hash
+    if request.method == 'POST':
+        retry_after = limiter.check('login_ip', request.remote_addr)
+        if retry_after:
+            return _too_many_attempts('auth/login.html', retry_after, form=form)
     if form.validate_on_submit():
         email = normalize_email(form.email.data)
+        retry_after = limiter.check('login_email', email)
+        if retry_after:
+            return _too_many_attempts('auth/login.html', retry_after, form=form)
         user = User.query.filter_by(email=email).first()
-        if user and check_password_hash(user.password, form.password.data):
+        try:
+            valid = user is not None and hasher.verify(user.password, form.password.data)
+        except HasherBusy:
+            flash('Hay muchos inicios de sesión en curso. Intenta de nuevo en unos segundos.', 'warning')
+            return render_template('auth/login.html', form=form), 503
+        if valid:
+            _rehash_if_needed(user, form.password.data)
             login_user(user, remember=form.remember.data if hasattr(form, "remember") else False)
+            audit.record(user.id, 'login', 'login', user.id)
             flash('Inicio de sesión exitoso.', 'success')
             return redirect(url_for('dashboard.home'))
         else:
+            if user:
+                audit.record(user.id, 'login_failed', 'login', user.id)
             flash('Credenciales inválidas.', 'danger')
     return render_template('auth/login.html', form=form)
 
@@ -57,9 +73,18 @@ def register():
     form = RegisterForm()
     suggested = []
 
+    if request.method == 'POST':
+        retry_after = limiter.check('register_ip', request.remote_addr)
+        if retry_after:
+            return _too_many_attempts('auth/register.html', retry_after, form=form, suggested=suggested)
+
     if form.validate_on_submit():
         # Normalizaciones
         email = normalize_email(form.email.data)
+        # Por email además de por IP: rotar IPs no sirve para sondear qué emails existen
+        retry_after = limiter.check('register_email', email)
+        if retry_after:
+            return _too_many_attempts('auth/register.html', retry_after, form=form, suggested=suggested)
         # Si no envía subdomain, usamos store_name como base
         raw_sub = (form.subdomain.data or form.store_name.data or "").strip()
         subdomain = slugify(raw_sub)
@@ -82,7 +107,11 @@ def register():
             return render_template('auth/register.html', form=form, suggested=suggested)
 
         # Crear usuario
-        hashed_password = generate_password_hash(form.password.data)
+        try:
+            hashed_password = hasher.hash(form.password.data)
+        except HasherBusy:
+            flash('Hay muchos registros en curso. Intenta de nuevo en unos segundos.', 'warning')
+            return render_template('auth/register.html', form=form, suggested=suggested), 503
         new_user = User(
             username=form.username.data.strip(),
             userlastname=form.userlastname.data.strip(),
@@ -99,7 +128,12 @@ def register():
 
         try:
             db.session.add(new_user)
+            db.session.flush()
+            db.session.add(StoreStats(user_id=new_user.id))
             db.session.commit()
+            tenant_map.update(new_user)
+            availability_cache.delete(subdomain)
+            audit.record(new_user.id, 'register', 'user', new_user.id)
             flash('Cuenta creada con éxito. Ahora puedes iniciar sesión.', 'success')
             return redirect(url_for('auth.login'))
         except IntegrityError as e:
@@ -123,9 +157,26 @@ def register():
     return render_template('auth/register.html', form=form, suggested=suggested)
 
 
+@bp.route('/subdomain-availability')
+def subdomain_check():
+    """Chequeo en vivo del subdominio para el formulario de registro (JSON)."""
+    # Cada tecla es una petición, pero sin límite sirve para enumerar tiendas
+    retry_after = limiter.check('subdomain_check_ip', request.remote_addr)
+    if retry_after:
+        resp = jsonify(error='Demasiadas consultas.', retry_after=retry_after)
+        resp.status_code = 429
+        resp.headers['Retry-After'] = str(retry_after)
+        return resp
+    raw = (request.args.get('subdomain') or '').strip()
+    if not raw:
+        return jsonify(error='Falta el parámetro subdomain.'), 400
+    return jsonify(subdomain_availability(raw))
+
+
 @bp.route('/logout')
 @login_required
 def logout():
+    audit.record(current_user.id, 'logout', 'login', current_user.id)
     logout_user()
     # Limpia pendientes y comunica estado
     from flask import get_flashed_messages
@@ -1,14 +1,22 @@
 # app/routes/dashboard.py
-from flask import Blueprint, render_template, redirect, url_for, request, flash, abort
+from flask import Blueprint, render_template, redirect, url_for, request, flash, abort, Response, stream_with_context
 from flask_login import login_required, current_user
 from app.models import Product, User, SocialMedia
 from app import db
-from sqlalchemy.exc import IntegrityError
-from datetime import datetime
+from app.utils.cache import catalog_cache, store_tag
+from app.utils.audit import audit
+from app.utils.search import search_index
+from app.utils.tenants import tenant_map
+from app.utils.user_cache import invalidate_user
+from app.utils import images, uploads, pricing, store_stats, upload_gc
+from app.utils.pagination import keyset_paginate, InvalidCursor
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from datetime import date, datetime
 from decimal import Decimal, InvalidOperation
-import os
-import uuid
-from werkzeug.utils import secure_filename
+import csv
+import io
+import json
 from flask import current_app
 import re
 from urllib.parse import quote_plus, urlparse, parse_qs, unquote_plus
@@ -17,10 +25,14 @@ from urllib.parse import quote_plus, urlparse, parse_qs, unquote_plus
 
 bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
 
+# Orden del listado del dashboard (clave del cursor)
+LISTING_ORDER = [(Product.created_at, True), (Product.id, True)]
 
 
 
 # ---------- Helpers ----------
+PRICE_MAX = Decimal("100000000")   # Numeric(10, 2)
+
 def _parse_decimal(value: str, field_name="precio"):
     if value is None or str(value).strip() == "":
         raise ValueError(f"El {field_name} es requerido.")
@@ -28,6 +40,9 @@ def _parse_decimal(value: str, field_name="precio"):
         d = Decimal(str(value))
         if d < 0:
             raise ValueError(f"El {field_name} no puede ser negativo.")
+        # Numeric(10, 2): el INSERT fallaría (y en la importación, todo el archivo)
+        if not d.is_finite() or d >= PRICE_MAX:
+            raise ValueError(f"{field_name.capitalize()} fuera de rango.")
         return d
     except (InvalidOperation, ValueError):
         raise ValueError(f"{field_name.capitalize()} inválido.")
@@ -41,6 +56,18 @@ def _parse_date(value: str):
     except ValueError:
         raise ValueError("Fecha inválida (usa formato AAAA-MM-DD).")
 
+def _touch_store(user_id: int):
+    """
+    Marca la tienda como modificada (updated_at y catalog_version). Toda
+    escritura visible en el catálogo debe pasar por aquí: el ETag sale de la
+    versión, no de timestamps con resolución de segundos.
+    """
+    store_stats.touch(user_id)
+
+def _store_version(user_id: int) -> int:
+    """catalog_version ya confirmada, para que el índice de búsqueda la adopte."""
+    return db.session.query(User.catalog_version).filter(User.id == user_id).scalar()
+
 def _own_product_or_404(pid: int):
     prod = Product.query.get_or_404(pid)
     if prod.user_id != current_user.id:
@@ -51,19 +78,26 @@ def _own_product_or_404(pid: int):
 @bp.route('/')
 @login_required
 def index():
-    page = request.args.get('page', 1, type=int)
     per_page = 10
 
     q = Product.query.filter_by(user_id=current_user.id)
-    products = q.order_by(Product.created_at.desc()).paginate(page=page, per_page=per_page)
-    total = q.count()
-    disponibles = q.filter_by(status='available').count()
+    try:
+        products = keyset_paginate(
+            q, LISTING_ORDER, per_page,
+            after=request.args.get('after') or None,
+            before=request.args.get('before') or None,
+        )
+    except InvalidCursor:
+        abort(400)
+    # Contadores denormalizados: lectura O(1) en vez de COUNT sobre products
+    stats = store_stats.get(current_user.id)
 
     return render_template(
         'dashboard/index.html',
         products=products,
-        total=total,
-        disponibles=disponibles
+        total=stats.total,
+        disponibles=stats.available,
+        stats=stats
     )
 
 # -------- Home ----------
@@ -114,9 +148,7 @@ def product_new():
             # Imagen: archivo subido tiene prioridad sobre URL
             final_image_value = None
             if file and file.filename:
-                if not _allowed_image(file.filename):
-                    raise ValueError("Formato de imagen no permitido.")
-                final_image_value = _save_image(file, current_user.id)  # ej: "uploads/42/uuid.jpg"
+                final_image_value = uploads.save_image(file, current_user.id)  # ej: "uploads/42/<sha256>.jpg"
             elif image_url_field:
                 final_image_value = image_url_field  # link externo
 
@@ -131,8 +163,16 @@ def product_new():
                 image_url=final_image_value,   # relativo o absoluto
                 status=status if status in ('available', 'unavailable') else 'available'
             )
+            p.effective_price = pricing.effective_price(p)
             db.session.add(p)
+            store_stats.apply_delta(current_user.id, after=store_stats.contribution(p))
+            _touch_store(current_user.id)
             db.session.commit()
+            if file and file.filename:
+                images.schedule_variants(current_app._get_current_object(), p.id, p.image_url)
+            search_index.index_product(p, _store_version(current_user.id))
+            audit.record(current_user.id, 'product_create', 'product', p.id, p.name)
+            catalog_cache.invalidate_tag(store_tag(current_user.subdomain))
             flash('Producto creado correctamente.', 'success')
             return redirect(url_for('dashboard.index'))
 
@@ -151,6 +191,7 @@ def product_edit(id):
     product = _own_product_or_404(id)
 
     if request.method == 'POST':
+        stats_before = store_stats.snapshot(product)
         # Lectura de campos del formulario
         name = request.form.get('name', '').strip()
         description = request.form.get('description', '').strip()
@@ -180,21 +221,19 @@ def product_edit(id):
 
             # Imagen:
             if file and file.filename:
-                if not _allowed_image(file.filename):
-                    raise ValueError("Formato de imagen no permitido.")
-                # Borrar archivo anterior si era local
-                if product.image_url and not product.image_url.startswith("http"):
-                    old_abs = os.path.join("app/static", product.image_url)
-                    if os.path.exists(old_abs):
-                        try:
-                            os.remove(old_abs)
-                        except OSError:
-                            pass
-                product.image_url = _save_image(file, current_user.id)
+                new_image = uploads.save_image(file, current_user.id)
+                if new_image != product.image_url:
+                    # Borrar archivo anterior (y sus variantes) si nadie más lo usa
+                    _release_local_image(product, product.image_url, product.image_variants)
+                    product.image_url = new_image
+                    product.image_variants = None
             else:
                 # Si no se sube nueva, permitir reemplazo por URL (opcional)
-                if image_url_field:
+                if image_url_field and image_url_field != product.image_url:
+                    # La subida local que se reemplaza queda huérfana igual que arriba
+                    _release_local_image(product, product.image_url, product.image_variants)
                     product.image_url = image_url_field
+                    product.image_variants = None
 
             # Asignar campos restantes
             product.name = name
@@ -204,8 +243,16 @@ def product_edit(id):
             product.discount_start = discount_start
             product.discount_end = discount_end
             product.status = status if status in ('available', 'unavailable') else 'available'
+            product.effective_price = pricing.effective_price(product)
+            store_stats.apply_delta(current_user.id, stats_before, store_stats.contribution(product))
+            _touch_store(current_user.id)
 
             db.session.commit()
+            if file and file.filename:
+                images.schedule_variants(current_app._get_current_object(), product.id, product.image_url)
+            search_index.index_product(product, _store_version(current_user.id))
+            audit.record(current_user.id, 'product_update', 'product', product.id, product.name)
+            catalog_cache.invalidate_tag(store_tag(current_user.subdomain))
             flash('Producto actualizado.', 'success')
             return redirect(url_for('dashboard.index'))
 
@@ -222,26 +269,216 @@ def product_edit(id):
 def product_delete(id):
     product = _own_product_or_404(id)
 
-    # Borrar imagen local si existe y no es URL externa
-    if product.image_url and not product.image_url.startswith("http"):
-        old_abs = os.path.join("app/static", product.image_url)
-        if os.path.exists(old_abs):
-            try:
-                os.remove(old_abs)
-            except OSError:
-                pass
+    # Borrar imagen local (y sus variantes) si existe y no es URL externa
+    _release_local_image(product, product.image_url, product.image_variants)
 
+    user_id, product_id, product_name = product.user_id, product.id, product.name
+    stats_before = store_stats.contribution(product)
+    # Primero el DELETE: si falta la fila de store_stats, apply_delta recalcula
+    # desde products y ese conteo ya no debe incluir este producto
     db.session.delete(product)
+    db.session.flush()
+    store_stats.apply_delta(user_id, before=stats_before)
+    _touch_store(user_id)
     db.session.commit()
+    search_index.remove_product(user_id, product_id, _store_version(user_id))
+    audit.record(user_id, 'product_delete', 'product', product_id, product_name)
+    catalog_cache.invalidate_tag(store_tag(current_user.subdomain))
     flash('Producto eliminado.', 'info')
     return redirect(url_for('dashboard.index'))
 
 
+# ---------- Importación / exportación masiva ----------
+IMPORT_FIELDS = ('name', 'description', 'price', 'original_price',
+                 'discount_start', 'discount_end', 'image_url', 'status')
+
+IMAGE_URL_MAX = 255   # largo de Product.image_url
+
+def _row_text(row: dict, key: str) -> str:
+    """Texto de una celda; en JSONL los números se aceptan, listas/objetos no."""
+    value = row.get(key)
+    if value is None:
+        return ''
+    if isinstance(value, bool) or not isinstance(value, (str, int, float, Decimal)):
+        raise ValueError(f"El campo {key} debe ser texto.")
+    return str(value).strip()
+
+def _import_row_values(row: dict, user_id: int) -> dict:
+    """Valida una fila importada con las mismas reglas del formulario."""
+    name = _row_text(row, 'name')
+    if not name:
+        raise ValueError("El nombre es requerido.")
+    if len(name) > 100:
+        raise ValueError("El nombre supera los 100 caracteres.")
+
+    price = _parse_decimal(_row_text(row, 'price'), "precio")
+    original_raw = _row_text(row, 'original_price')
+    original_price = _parse_decimal(original_raw, "precio original") if original_raw else None
+
+    discount_start = _parse_date(_row_text(row, 'discount_start'))
+    discount_end = _parse_date(_row_text(row, 'discount_end'))
+    if discount_start and discount_end and discount_end < discount_start:
+        raise ValueError("La fecha fin de descuento no puede ser anterior al inicio.")
+
+    # Solo enlaces externos: una ruta local podría apuntar a archivos de otra tienda
+    image_url = _row_text(row, 'image_url') or None
+    if image_url and not re.match(r'^https?://', image_url, flags=re.I):
+        raise ValueError("image_url debe ser una URL http(s).")
+    if image_url and len(image_url) > IMAGE_URL_MAX:
+        raise ValueError(f"image_url supera los {IMAGE_URL_MAX} caracteres.")
+
+    status = _row_text(row, 'status') or 'available'
+    values = dict(
+        user_id=user_id,
+        name=name,
+        description=_row_text(row, 'description') or None,
+        price=price,
+        original_price=original_price,
+        discount_start=discount_start,
+        discount_end=discount_end,
+        image_url=image_url,
+        status=status if status in ('available', 'unavailable') else 'available',
+    )
+    values['effective_price'] = pricing.effective_price(values)
+    return values
+
+def _iter_import_rows(file_storage):
+    """Genera (nº de línea, dict) leyendo el archivo en streaming (CSV o JSONL)."""
+    text = io.TextIOWrapper(file_storage.stream, encoding='utf-8-sig', newline='')
+    if (file_storage.filename or '').lower().endswith(('.jsonl', '.ndjson', '.json')):
+        for line_no, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_no, ValueError("JSON inválido.")
+                continue
+            yield line_no, row if isinstance(row, dict) else ValueError("Cada línea debe ser un objeto JSON.")
+    else:
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+
+def _add_contributions(acc, rows):
+    for row in rows:
+        acc = tuple(a + b for a, b in zip(acc, store_stats.contribution(row)))
+    return acc
+
+@bp.route('/products/import', methods=['GET', 'POST'])
+@login_required
+def product_import():
+    report = None
+    if request.method == 'POST':
+        file = request.files.get('file')
+        if not file or not file.filename:
+            flash('Selecciona un archivo CSV o JSONL.', 'danger')
+            return redirect(url_for('dashboard.product_import'))
+
+        batch_size = current_app.config.get("IMPORT_BATCH_SIZE", 500)
+        max_rows = current_app.config.get("IMPORT_MAX_ROWS", 20000)
+        max_errors = 100
+        inserted = 0
+        errors = []
+        error_count = 0
+        batch = []
+        stats_delta = (0, 0, 0, 0)
+
+        try:
+            for line_no, row in _iter_import_rows(file):
+                if inserted + len(batch) + error_count >= max_rows:
+                    errors.append((line_no, f"Se alcanzó el máximo de {max_rows} filas; el resto se ignoró."))
+                    break
+                try:
+                    if isinstance(row, Exception):
+                        raise row
+                    batch.append(_import_row_values(row, current_user.id))
+                except ValueError as e:
+                    error_count += 1
+                    if len(errors) < max_errors:
+                        errors.append((line_no, str(e)))
+                    continue
+                if len(batch) >= batch_size:
+                    db.session.execute(insert(Product), batch)   # INSERT multi-fila
+                    inserted += len(batch)
+                    stats_delta = _add_contributions(stats_delta, batch)
+                    batch = []
+            if batch:
+                db.session.execute(insert(Product), batch)
+                inserted += len(batch)
+                stats_delta = _add_contributions(stats_delta, batch)
+            store_stats.apply_delta(current_user.id, after=stats_delta)
+            _touch_store(current_user.id)
+            db.session.commit()   # una sola transacción para todo el archivo
+        except (SQLAlchemyError, UnicodeDecodeError, csv.Error) as e:
+            db.session.rollback()
+            current_app.logger.warning("Importación fallida: %s", e)
+            flash('No se pudo importar el archivo; no se guardó ningún producto.', 'danger')
+            return redirect(url_for('dashboard.product_import'))
+
+        if inserted:
+            search_index.invalidate_store(current_user.id)
+            catalog_cache.invalidate_tag(store_tag(current_user.subdomain))
+            audit.record(current_user.id, 'product_import', 'store', current_user.id,
+                         f"{inserted} productos importados, {error_count} filas con errores")
+        report = dict(inserted=inserted, error_count=error_count, errors=errors)
+        flash(f'Se importaron {inserted} productos.', 'success' if not error_count else 'warning')
+
+    return render_template('dashboard/product_import.html', report=report, fields=IMPORT_FIELDS)
+
+def _export_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+@bp.route('/products/export.<fmt>')
+@login_required
+def product_export(fmt):
+    if fmt not in ('csv', 'jsonl'):
+        abort(404)
+
+    cols = [getattr(Product, f) for f in ('id', *IMPORT_FIELDS)]
+    rows = (db.session.query(*cols)
+            .filter(Product.user_id == current_user.id)
+            .order_by(Product.id)
+            .execution_options(stream_results=True, yield_per=1000))
+    header = ['id', *IMPORT_FIELDS]
+
+    def generate():
+        # Se emite por bloques sin materializar el catálogo completo
+        buf = io.StringIO()
+        writer = csv.writer(buf) if fmt == 'csv' else None
+        if writer:
+            writer.writerow(header)
+        for n, row in enumerate(rows, start=1):
+            values = [_export_value(v) for v in row]
+            if writer:
+                writer.writerow(['' if v is None else v for v in values])
+            else:
+                buf.write(json.dumps(dict(zip(header, values)), ensure_ascii=False) + '\n')
+            if n % 500 == 0:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    filename = f"{current_user.subdomain}-productos.{fmt}"
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 # ---------- Perfil de la tienda / usuario ----------
 @bp.route('/profile', methods=['GET', 'POST'])
 @login_required
 def profile():
-    user: User = current_user  # type: ignore
+    # current_user es una copia de solo lectura; se edita la fila real
+    user = db.session.get(User, current_user.id)
 
     if request.method == 'POST':
         user.username = request.form.get('username', user.username).strip() or user.username
@@ -253,7 +490,11 @@ def profile():
         user.city = request.form.get('city', user.city).strip() or user.city
 
         try:
+            _touch_store(user.id)
             db.session.commit()
+            invalidate_user(user.id)
+            tenant_map.update(user)
+            catalog_cache.invalidate_tag(store_tag(user.subdomain))
             flash('Perfil actualizado.', 'success')
             return redirect(url_for('dashboard.profile'))
         except IntegrityError:
@@ -267,32 +508,9 @@ def profile():
 
 
 # -------- Manejo de imágenes -----------
-# imagenes permitidas
-def _allowed_image(filename: str) -> bool:
-    if "." not in filename:
-        return False
-    ext = filename.rsplit(".", 1)[1].lower()
-    return ext in current_app.config.get("ALLOWED_IMAGE_EXTENSIONS", set())
-# guardar imagen
-
-def _save_image(file_storage, user_id: int) -> str:
-    base_folder = current_app.config.get("UPLOAD_FOLDER", "app/static/uploads")
-    user_folder = os.path.join(base_folder, str(user_id))
-    os.makedirs(user_folder, exist_ok=True)
-
-    original = secure_filename(file_storage.filename)
-    ext = original.rsplit(".", 1)[1].lower()
-    unique = f"{uuid.uuid4().hex}.{ext}"
-
-    abs_path = os.path.join(user_folder, unique)
-    file_storage.save(abs_path)
-
-    rel_from_static = os.path.relpath(abs_path, start="app/static")
-
-    # 🔧 Fix aquí: convertir `\` en `/` para rutas web
-    rel_from_static = rel_from_static.replace("\\", "/")
-
-    return rel_from_static
+def _release_local_image(product, image_url: str | None, variants=None):
+    """Borra el archivo (y sus variantes) después del commit si ningún otro producto del dueño lo usa."""
+    upload_gc.deleter.schedule_delete(db.session, product.user_id, image_url, images.variant_paths(variants))
 
 
 
@@ -415,7 +633,7 @@ def _extract_whatsapp_parts(url: str) -> tuple[str | None, str | None]:
 @bp.route('/social', methods=['GET', 'POST'])
 @login_required
 def social():
-    user: User = current_user  # type: ignore
+    user = current_user
 
     if request.method == 'POST':
         # Instagram/Twitter/TikTok/Facebook: permitimos handle o URL
@@ -441,7 +659,10 @@ def social():
             _upsert_social(user.id, "tiktok",    tk_url)
             _upsert_social(user.id, "facebook",  fb_url)
             _upsert_social(user.id, "whatsapp",  wa_url)
+            _touch_store(user.id)
             db.session.commit()
+            invalidate_user(user.id)
+            catalog_cache.invalidate_tag(store_tag(user.subdomain))
             flash('Enlaces sociales actualizados.', 'success')
         except IntegrityError:
             db.session.rollback()
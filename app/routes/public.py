@@ -1,52 +1,295 @@
-from flask import Blueprint, render_template, request
-from app.models import User, Product
-from sqlalchemy import or_
+from flask import (Blueprint, render_template, request, abort, make_response, current_app,
+                   jsonify, stream_with_context, url_for)
+from app import db
+from app.models import User, Product, SocialMedia
+from app.utils.cache import catalog_cache, store_tag
+from app.utils.search import search_index, rank, tokenize
+from app.utils.tenants import tenant_map
+from app.utils.pagination import keyset_paginate, offset_paginate, InvalidCursor
+from app.utils import jsonfast
+from app.utils.image_proxy import image_proxy
+from sqlalchemy import bindparam, case, func, or_, select
+import hashlib
 
 bp = Blueprint("public", __name__, url_prefix="/public")
 
+# Columnas de orden de cada sort; todas terminan en id para que el orden sea total
+# y la misma dirección en toda la clave permite recorrer un único índice.
+SORT_KEYS = {
+    "new":        [(Product.created_at, True), (Product.id, True)],
+    "price_asc":  [(Product.effective_price, False), (Product.created_at, False), (Product.id, False)],
+    "price_desc": [(Product.effective_price, True), (Product.created_at, True), (Product.id, True)],
+}
+
+
+def _catalog_query(user_id: int, qtext: str, sort: str, version=None, use_index: bool = True):
+    """
+    Construye la consulta del catálogo público.
+    Devuelve (query, sort, ranking); `ranking` es {product_id: posición} si se
+    ordena por relevancia. `version` es la catalog_version de la tienda (el
+    índice de búsqueda se reconstruye si es otra).
+
+    Con texto, las coincidencias salen siempre del índice: por relevancia se
+    toman las SEARCH_MAX_RESULTS mejores; con los otros órdenes entran todas y
+    la BD solo ordena y pagina por la clave de siempre. use_index=False
+    filtra con ILIKE como antes del índice; solo lo usa `flask bench search`
+    como referencia.
+    """
+    q = Product.query.filter(
+        Product.user_id == user_id,
+        Product.status == "available"
+    )
+
+    if sort not in SORT_KEYS and sort != "relevance":
+        sort = "new"
+
+    ranking = {}
+    if qtext and not use_index:
+        for term in tokenize(qtext):
+            like = f"%{term}%"
+            q = q.filter(or_(Product.name.ilike(like), Product.description.ilike(like)))
+    elif qtext:
+        scores = search_index.scores(user_id, qtext, version)
+        if sort == "relevance":
+            hits = rank(scores)[:current_app.config.get("SEARCH_MAX_RESULTS", 1000)]
+            ranking = {pid: pos for pos, (pid, _score) in enumerate(hits)}
+            ids = list(ranking)
+        else:
+            ids = list(scores)
+        q = q.filter(Product.id.in_(_id_list(ids)))
+
+    if sort == "relevance" and not ranking:
+        sort = "new"
+    return q, sort, ranking
+
+
+def _id_list(ids: list[int]):
+    # Enteros del índice como literales: sin tope de parámetros (SQLite admite
+    # 32766) por grande que sea la lista
+    return bindparam("match_ids", ids, expanding=True, literal_execute=True)
+
+
+def _store_validator(user_id: int):
+    """
+    Validador barato de la tienda en una sola consulta (sin cargar productos):
+    (catalog_version de la tienda, last_modified, huella). La huella se basa
+    en catalog_version, que sube con cada cambio aunque caiga en el mismo
+    segundo que el anterior.
+    """
+    p_updated = select(func.max(Product.updated_at)).where(Product.user_id == User.id).scalar_subquery()
+    p_count = select(func.count(Product.id)).where(Product.user_id == User.id).scalar_subquery()
+    s_updated = select(func.max(SocialMedia.updated_at)).where(SocialMedia.user_id == User.id).scalar_subquery()
+
+    row = (db.session.query(User.catalog_version, User.updated_at, p_updated, p_count, s_updated)
+           .filter(User.id == user_id)
+           .first())
+    if row is None:
+        return None
+    version, u_updated, p_upd, p_cnt, s_upd = row
+    stamps = [t for t in (u_updated, p_upd, s_upd) if t is not None]
+    last_modified = max(stamps) if stamps else None
+    fingerprint = f"{user_id}|v{version}|{u_updated}|{p_upd}|{p_cnt}|{s_upd}"
+    return version, last_modified, fingerprint
+
+
+def _cache_headers(resp, etag: str, last_modified):
+    # El navegador siempre revalida (barato: 304); un CDN puede servir s-maxage
+    resp.set_etag(etag)
+    if last_modified is not None:
+        resp.last_modified = last_modified
+    resp.headers["Cache-Control"] = "public, max-age=0, s-maxage={}, stale-while-revalidate={}".format(
+        current_app.config.get("CATALOG_SHARED_MAX_AGE", 30),
+        current_app.config.get("CATALOG_STALE_WHILE_REVALIDATE", 60),
+    )
+    return resp
+
+
+def _not_modified(etag: str) -> bool:
+    # Solo el ETag: If-Modified-Since tiene resolución de segundos y no ve un
+    # cambio que cae en el mismo segundo (catalog_version sí)
+    return bool(request.if_none_match) and request.if_none_match.contains(etag)
+
+
 @bp.route("/<subdomain>")
 def store_catalog(subdomain):
-    user = User.query.filter_by(subdomain=subdomain).first_or_404(description="Tienda no encontrada")
-
     # Parámetros
     page     = max(1, request.args.get("page", 1, type=int))
     per_page = min(24, max(1, request.args.get("per_page", 12, type=int)))
     qtext    = (request.args.get("q", "") or "").strip()
-    sort     = request.args.get("sort", "new")  # new | price_asc | price_desc
+    sort     = request.args.get("sort", "new")  # new | price_asc | price_desc | relevance
+    after    = request.args.get("after") or None
+    before   = request.args.get("before") or None
 
-    # Query base
-    q = Product.query.filter(
-        Product.user_id == user.id,
-        Product.status == "available"
-    )
+    # La tienda sale del mapa en memoria; un subdominio desconocido no toca la BD
+    store = tenant_map.resolve(subdomain)
+    if store is None:
+        abort(404, description="Tienda no encontrada")
 
-    if qtext:
-        like = f"%{qtext}%"
-        q = q.filter(or_(Product.name.ilike(like), Product.description.ilike(like)))
+    # GET condicional: se responde 304 antes de cargar productos o renderizar
+    validator = _store_validator(store.id)
+    if validator is None:
+        tenant_map.remove(subdomain)
+        abort(404, description="Tienda no encontrada")
+    store_version, last_modified, fingerprint = validator
+    params = (page, per_page, qtext, sort, after, before)
+    etag = hashlib.sha1(f"{fingerprint}|{params}".encode()).hexdigest()
 
-    # Orden
-    if sort == "price_asc":
-        q = q.order_by(Product.price.asc(), Product.created_at.desc())
-    elif sort == "price_desc":
-        q = q.order_by(Product.price.desc(), Product.created_at.desc())
-    else:
-        q = q.order_by(Product.created_at.desc())
+    if _not_modified(etag):
+        return _cache_headers(current_app.response_class(status=304), etag, last_modified)
 
-    total = q.count()
-    products = q.paginate(page=page, per_page=per_page)
+    # Página ya renderizada; el ETag en la clave evita servir versiones viejas
+    # aunque la invalidación haya ocurrido en otro worker.
+    cache_key = (subdomain, etag)
+    html = catalog_cache.get(cache_key)
+    if html is not None:
+        resp = make_response(html)
+        resp.headers["X-Cache"] = "HIT"
+        return _cache_headers(resp, etag, last_modified)
+
+    # La copia en memoria puede estar vieja si la tienda se editó en otro worker
+    if store.catalog_version != store_version:
+        store = tenant_map.reload(subdomain) or abort(404)
+
+    q, sort, ranking = _catalog_query(store.id, qtext, sort, store_version)
+
+    if sort == "relevance":
+        # Resultados acotados por SEARCH_MAX_RESULTS: el OFFSET aquí es barato
+        q = q.order_by(case(ranking, value=Product.id), Product.id.desc())
+        products = offset_paginate(q, page, per_page)
+    else:
+        try:
+            products = keyset_paginate(q, SORT_KEYS[sort], per_page, after=after, before=before)
+        except InvalidCursor:
+            abort(400)
 
     # Redes sociales del comercio (dict por plataforma)
-    links = { sm.platform: sm.url for sm in user.socialmedia }
+    links = dict(
+        db.session.query(SocialMedia.platform, SocialMedia.url)
+        .filter(SocialMedia.user_id == store.id)
+        .all()
+    )
 
-    return render_template(
+    html = render_template(
         "public/store.html",
-        store_owner=user,
-        store_name=user.store_name,
-        store_slug=user.subdomain,     # para construir URLs
+        store_owner=store,
+        store_name=store.store_name,
+        store_slug=store.subdomain,    # para construir URLs
         products=products,
-        total=total,
         q=qtext,
         sort=sort,
         per_page=per_page,
         links=links,
     )
+    catalog_cache.set(cache_key, html, tags=(store_tag(subdomain),))
+
+    resp = make_response(html)
+    resp.headers["X-Cache"] = "MISS"
+    return _cache_headers(resp, etag, last_modified)
+
+
+# ---------- API JSON ----------
+# Columnas que la API puede devolver; `fields=` elige un subconjunto
+API_FIELDS = {
+    "id": Product.id,
+    "name": Product.name,
+    "description": Product.description,
+    "price": Product.effective_price,          # precio vigente
+    "original_price": Product.original_price,
+    "discount_start": Product.discount_start,
+    "discount_end": Product.discount_end,
+    "image_url": Product.image_url,
+    "image_variants": Product.image_variants,
+    "created_at": Product.created_at,
+    "updated_at": Product.updated_at,
+}
+API_DEFAULT_FIELDS = ("id", "name", "price", "original_price", "image_url")
+
+
+def _static_url(path):
+    if not path:
+        return path
+    if path.startswith(("http://", "https://")):
+        return image_proxy.url_for(path, external=True) if image_proxy.enabled else path
+    return url_for("static", filename=path, _external=True)
+
+
+def _api_row(row, fields):
+    item = {}
+    for name in fields:
+        value = getattr(row, name)
+        if name == "image_url":
+            value = _static_url(value)
+        elif name == "image_variants" and value:
+            value = {fmt: {w: _static_url(p) for w, p in sizes.items()} for fmt, sizes in value.items()}
+        item[name] = value
+    return item
+
+
+@bp.route("/<subdomain>/products.json")
+def store_products_json(subdomain):
+    """Catálogo en JSON: mismos filtros y orden que store_catalog, con `fields=`."""
+    max_per_page = current_app.config.get("API_MAX_PER_PAGE", 100)
+    page     = max(1, request.args.get("page", 1, type=int))
+    per_page = min(max_per_page, max(1, request.args.get("per_page", 24, type=int)))
+    qtext    = (request.args.get("q", "") or "").strip()
+    sort     = request.args.get("sort", "new")
+    after    = request.args.get("after") or None
+    before   = request.args.get("before") or None
+
+    raw_fields = request.args.get("fields")
+    fields = tuple(dict.fromkeys(f.strip() for f in raw_fields.split(",") if f.strip())) \
+        if raw_fields else API_DEFAULT_FIELDS
+    unknown = [f for f in fields if f not in API_FIELDS]
+    if unknown or not fields:
+        return jsonify(error="Campos no válidos: " + ", ".join(unknown),
+                       allowed=sorted(API_FIELDS)), 400
+
+    store = tenant_map.resolve(subdomain)
+    if store is None:
+        return jsonify(error="Tienda no encontrada"), 404
+    validator = _store_validator(store.id)
+    if validator is None:
+        tenant_map.remove(subdomain)
+        return jsonify(error="Tienda no encontrada"), 404
+    store_version, last_modified, fingerprint = validator
+    params = ("json", page, per_page, qtext, sort, after, before, fields)
+    etag = hashlib.sha1(f"{fingerprint}|{params}".encode()).hexdigest()
+    if _not_modified(etag):
+        return _cache_headers(current_app.response_class(status=304), etag, last_modified)
+
+    q, sort, ranking = _catalog_query(store.id, qtext, sort, store_version)
+
+    # Solo las columnas pedidas, más las del orden (las necesita el cursor)
+    order = SORT_KEYS.get(sort, [(Product.id, True)])
+    columns = [API_FIELDS[name].label(name) for name in fields]
+    columns += [col for col, _ in order if col.key not in fields]
+    q = q.with_entities(*columns)
+
+    if sort == "relevance":
+        q = q.order_by(case(ranking, value=Product.id), Product.id.desc())
+        products = offset_paginate(q, page, per_page)
+    else:
+        try:
+            products = keyset_paginate(q, SORT_KEYS[sort], per_page, after=after, before=before)
+        except InvalidCursor:
+            return jsonify(error="Cursor inválido"), 400
+
+    meta = {
+        "store": store.subdomain,
+        "sort": sort,
+        "count": len(products.items),
+        "next": products.next_args() if products.has_next else None,
+        "prev": products.prev_args() if products.has_prev else None,
+    }
+
+    def generate():
+        # Los productos se serializan por bloques para no armar un único string enorme
+        yield b'{"meta":' + jsonfast.dumps(meta) + b',"items":['
+        items = products.items
+        for i in range(0, len(items), 50):
+            chunk = [jsonfast.dumps(_api_row(row, fields)) for row in items[i:i + 50]]
+            yield (b"," if i else b"") + b",".join(chunk)
+        yield b"]}"
+
+    resp = current_app.response_class(stream_with_context(generate()), mimetype="application/json")
+    return _cache_headers(resp, etag, last_modified)
@@ -0,0 +1,133 @@
+"""
+Archivos estáticos con huella de contenido y precomprimidos.
+
+`flask assets build` copia cada archivo de static/ (salvo uploads/ y los
+.map) a static/dist/ con el hash del contenido en el nombre
+(css/style.css -> dist/css/style.1a2b3c4d5e6f.css), genera junto a los de
+texto una copia .gz y, si está instalado el paquete brotli, una .br, y
+escribe dist/manifest.json con el mapeo.
+
+Al arrancar, si existe el manifiesto, url_for('static', ...) devuelve el
+nombre con huella y la vista de estáticos entrega la variante comprimida que
+acepte el navegador, con Cache-Control inmutable de un año (el nombre cambia
+cuando cambia el contenido). Sin manifiesto todo funciona como antes.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+DIST = "dist"
+MANIFEST = "manifest.json"
+COMPRESSIBLE = (".css", ".js", ".svg", ".json", ".txt", ".html", ".xml", ".ico")
+MIN_COMPRESS_BYTES = 256
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Las subidas ya tienen el SHA-256 en el nombre (ver app/utils/uploads.py)
+_CONTENT_ADDRESSED = re.compile(r"^uploads/\d+/[0-9a-f]{64}(-\d+w)?\.\w+$")
+
+
+def _hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(64 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()[:12]
+
+
+def _compress(path: str) -> list[str]:
+    with open(path, "rb") as fh:
+        data = fh.read()
+    if len(data) < MIN_COMPRESS_BYTES:
+        return []
+    written = []
+    # mtime=0: la misma entrada produce el mismo .gz en cada build
+    variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(data, quality=11)))
+    for ext, payload in variants:
+        if len(payload) < len(data) * 0.95:
+            with open(path + ext, "wb") as fh:
+                fh.write(payload)
+            written.append(ext)
+    return written
+
+
+def build(static_folder: str, exclude=("uploads/", DIST + "/"), skip_ext=(".map",)) -> dict:
+    """Regenera static/dist/ y devuelve el manifiesto {original: con huella}."""
+    dist_root = os.path.join(static_folder, DIST)
+    shutil.rmtree(dist_root, ignore_errors=True)
+
+    manifest = {}
+    for root, _dirs, files in os.walk(static_folder):
+        for filename in sorted(files):
+            src = os.path.join(root, filename)
+            rel = os.path.relpath(src, static_folder).replace("\\", "/")
+            if rel.startswith(tuple(exclude)) or rel.endswith(tuple(skip_ext)):
+                continue
+            stem, ext = os.path.splitext(rel)
+            hashed = f"{DIST}/{stem}.{_hash_file(src)}{ext}"
+            dest = os.path.join(static_folder, hashed)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            shutil.copy2(src, dest)
+            if ext.lower() in COMPRESSIBLE:
+                _compress(dest)
+            manifest[rel] = hashed
+
+    with open(os.path.join(dist_root, MANIFEST), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=1, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder: str) -> dict:
+    try:
+        with open(os.path.join(static_folder, DIST, MANIFEST), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def init_app(app):
+    manifest = load_manifest(app.static_folder) if app.config.get("ASSETS_FINGERPRINT", True) else {}
+    app.extensions["assets_manifest"] = manifest
+
+    if manifest:
+        @app.url_defaults
+        def _fingerprinted_static(endpoint, values):
+            if endpoint == "static" and "filename" in values:
+                values["filename"] = manifest.get(values["filename"].lstrip("/"), values["filename"])
+
+    folder = app.static_folder
+
+    def static(filename):
+        filename = filename.lstrip("/")
+        immutable = filename.startswith(DIST + "/") or bool(_CONTENT_ADDRESSED.match(filename))
+        resp = None
+        if filename.startswith(DIST + "/"):
+            for encoding, ext in (("br", ".br"), ("gzip", ".gz")):
+                if request.accept_encodings[encoding] and os.path.isfile(os.path.join(folder, filename + ext)):
+                    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+                    resp = send_from_directory(folder, filename + ext, mimetype=mimetype)
+                    resp.headers["Content-Encoding"] = encoding
+                    break
+            resp = resp or send_from_directory(folder, filename)
+            resp.vary.add("Accept-Encoding")
+        else:
+            resp = send_from_directory(folder, filename, max_age=app.get_send_file_max_age(filename))
+        if immutable:
+            resp.headers["Cache-Control"] = IMMUTABLE
+        return resp
+
+    # Reemplaza la vista que Flask registra para static_url_path
+    app.view_functions["static"] = static
+    return manifest
@@ -0,0 +1,151 @@
+"""
+Registro de auditoría (tabla `logs`) con escritura diferida.
+
+Las vistas solo encolan el evento en una cola acotada en memoria; un hilo en
+segundo plano lo inserta en lotes multi-fila cuando se juntan
+AUDIT_BATCH_SIZE eventos o pasan AUDIT_FLUSH_INTERVAL segundos. Si la cola
+está llena el evento se descarta (y se cuenta) en lugar de frenar la
+petición. Al terminar el proceso se vacía lo pendiente.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from flask import has_request_context, request
+from sqlalchemy import insert
+
+log = logging.getLogger(__name__)
+
+
+class AuditLogger:
+
+    def __init__(self):
+        self.app = None
+        self._queue = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._pid = None
+        self._lock = threading.Lock()
+        self.enqueued = self.written = self.dropped = self.failed = self.batches = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get("AUDIT_LOG_ENABLED", True)
+        self.queue_size = app.config.get("AUDIT_QUEUE_SIZE", 10000)
+        self.batch_size = app.config.get("AUDIT_BATCH_SIZE", 200)
+        self.flush_interval = app.config.get("AUDIT_FLUSH_INTERVAL", 2.0)
+        atexit.register(self.shutdown)
+
+    # ---------- API para las vistas ----------
+    def record(self, user_id: int, action: str, entity_type: str,
+               entity_id: int | None = None, description: str | None = None):
+        if not self.enabled or user_id is None:
+            return
+        event = dict(
+            user_id=user_id,
+            action=action,
+            entity_type=entity_type,
+            entity_id=entity_id,
+            description=description,
+            created_at=datetime.now(),
+        )
+        if has_request_context():
+            event["ip_address"] = (request.remote_addr or "")[:45] or None
+            event["user_agent"] = request.user_agent.string or None
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(event)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+    # ---------- Hilo de escritura ----------
+    def _ensure_started(self):
+        # Tras un fork (gunicorn) el hilo del padre no existe en el hijo
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="audit-logger", daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while not self._stop.is_set():
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                pass
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                if batch:
+                    self._write(batch)
+                    batch = []
+                deadline = time.monotonic() + self.flush_interval
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch):
+        from app import db
+        from app.models import Log
+
+        with self.app.app_context():
+            try:
+                db.session.execute(insert(Log), batch)
+                db.session.commit()
+                self.written += len(batch)
+                self.batches += 1
+            except Exception:
+                db.session.rollback()
+                self.failed += len(batch)
+                log.exception("No se pudieron guardar %d eventos de auditoría", len(batch))
+            finally:
+                db.session.remove()
+
+    def flush(self):
+        """Escribe de inmediato todo lo encolado (desde el hilo que llama)."""
+        if self._queue is None:
+            return
+        pending = []
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(pending) >= self.batch_size:
+                self._write(pending)
+                pending = []
+        if pending:
+            self._write(pending)
+
+    def shutdown(self, timeout: float = 5.0):
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": getattr(self, "queue_size", 0),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+audit = AuditLogger()
@@ -0,0 +1,47 @@
+"""
+Opciones del pool de conexiones de SQLAlchemy.
+
+Se arman a partir de DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE,
+DB_POOL_PRE_PING, DB_POOL_TIMEOUT y DB_STATEMENT_TIMEOUT_MS (milisegundos)
+antes de db.init_app; lo que ya venga en SQLALCHEMY_ENGINE_OPTIONS tiene
+prioridad. Con SQLite no se toca nada (no hay servidor ni conexiones que
+caduquen).
+"""
+
+
+def engine_options(app) -> dict:
+    uri = app.config.get("SQLALCHEMY_DATABASE_URI") or ""
+    options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    if uri.startswith("sqlite"):
+        return options
+
+    options.setdefault("pool_size", app.config.get("DB_POOL_SIZE", 5))
+    options.setdefault("max_overflow", app.config.get("DB_MAX_OVERFLOW", 10))
+    options.setdefault("pool_timeout", app.config.get("DB_POOL_TIMEOUT", 10))
+    # MySQL cierra conexiones inactivas (wait_timeout); se reciclan antes
+    options.setdefault("pool_recycle", app.config.get("DB_POOL_RECYCLE", 280))
+    options.setdefault("pool_pre_ping", app.config.get("DB_POOL_PRE_PING", True))
+
+    timeout_ms = app.config.get("DB_STATEMENT_TIMEOUT_MS")
+    if timeout_ms:
+        connect_args = dict(options.get("connect_args") or {})
+        if uri.startswith("mysql"):
+            # mysqlclient y PyMySQL ejecutan init_command al abrir cada conexión
+            connect_args.setdefault("init_command", f"SET SESSION max_execution_time={int(timeout_ms)}")
+        elif uri.startswith("postgresql"):
+            connect_args.setdefault("options", f"-c statement_timeout={int(timeout_ms)}")
+        options["connect_args"] = connect_args
+    return options
+
+
+def pool_stats(engine) -> dict:
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__, "status": pool.status()}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        fn = getattr(pool, name, None)
+        if callable(fn):
+            stats[name] = fn()
+    if "size" in stats and "checkedout" in stats:
+        capacity = stats["size"] + max(0, getattr(pool, "_max_overflow", 0))
+        stats["utilization"] = round(stats["checkedout"] / capacity, 3) if capacity > 0 else None
+    return stats
@@ -0,0 +1,403 @@
+"""
+Proxy con caché para las imágenes externas de los productos.
+
+Un producto puede apuntar a una URL http(s) ajena; en vez de enlazarla tal
+cual, image_url() devuelve /_img?u=<url>&s=<firma>[&w=<ancho>]. La firma
+(HMAC con SECRET_KEY) impide usar el endpoint como proxy abierto.
+
+- La primera petición descarga la imagen con timeout por operación de
+  socket (IMAGE_PROXY_TIMEOUT) y plazo total (IMAGE_PROXY_TOTAL_TIMEOUT: un
+  origen que manda un byte por vez no retiene el hilo), tope de bytes (IMAGE_PROXY_MAX_BYTES) y de píxeles (IMAGE_PROXY_MAX_PIXELS),
+  a lo sumo IMAGE_PROXY_MAX_REDIRECTS redirecciones y solo hacia IPs públicas
+  (la IP se comprueba ya conectado, así que tampoco sirve un DNS que cambie
+  de respuesta). IMAGE_PROXY_ALLOW_PRIVATE=True lo relaja para pruebas con
+  un servidor local.
+- La imagen se normaliza (orientación EXIF, sin metadatos), se reduce al
+  ancho pedido (nunca se agranda) y se guarda en WebP o JPEG según Accept.
+  El original descargado también queda en caché (<sha256(url)>.orig): los
+  demás anchos y formatos salen de esa copia sin volver al origen.
+- La caché vive en disco (IMAGE_PROXY_CACHE_DIR, por defecto
+  instance/image_proxy), con nombre sha256(url)-<ancho>.<formato> y límite
+  total IMAGE_PROXY_CACHE_BYTES para todos los workers juntos; al pasarlo
+  se borran las menos usadas (el mtime marca el último uso, así el orden
+  sobrevive a reinicios).
+- Los fallos se recuerdan IMAGE_PROXY_ERROR_TTL segundos para no martillar
+  al origen.
+Sin Pillow o con IMAGE_PROXY_ENABLED=False las URLs externas se enlazan
+directamente, como antes.
+"""
+import hashlib
+import hmac
+import http.client
+import io
+import ipaddress
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlsplit
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - dependencia opcional
+    Image = None
+
+from flask import abort, request, send_file, url_for
+
+from app.utils.cache import TTLCache
+from app.utils.images import DEFAULT_WIDTHS
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAX_WIDTH = 1024
+ALLOWED_FORMATS = {"JPEG", "PNG", "GIF", "WEBP"}
+CHUNK_SIZE = 64 * 1024
+
+
+class ProxyError(Exception):
+    def __init__(self, message: str, status: int = 502):
+        super().__init__(message)
+        self.status = status
+
+
+# ---------- Descarga protegida (SSRF) ----------
+_allow_private = False
+
+
+def _check_address(ip: str):
+    if _allow_private:
+        return
+    addr = ipaddress.ip_address(ip.split("%", 1)[0])
+    if getattr(addr, "ipv4_mapped", None):
+        addr = addr.ipv4_mapped
+    if not addr.is_global or addr.is_multicast:
+        raise ProxyError(f"Destino no permitido: {ip}", 403)
+
+
+def _verify_peer(conn):
+    try:
+        _check_address(conn.sock.getpeername()[0])
+    except ProxyError:
+        conn.close()
+        raise
+
+
+class _GuardedHTTPConnection(http.client.HTTPConnection):
+    def connect(self):
+        super().connect()
+        _verify_peer(self)
+
+
+class _GuardedHTTPSConnection(http.client.HTTPSConnection):
+    def connect(self):
+        super().connect()
+        _verify_peer(self)
+
+
+class _HTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_GuardedHTTPConnection, req)
+
+
+class _HTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_GuardedHTTPSConnection, req, context=self._context)
+
+
+def _build_opener(max_redirects: int):
+    # Sin build_opener: solo http/https (nada de file://, ftp:// ni proxies del entorno)
+    redirects = urllib.request.HTTPRedirectHandler()
+    redirects.max_redirections = max_redirects
+    opener = urllib.request.OpenerDirector()
+    for handler in (_HTTPHandler(), _HTTPSHandler(), redirects,
+                    urllib.request.HTTPDefaultErrorHandler(), urllib.request.HTTPErrorProcessor()):
+        opener.add_handler(handler)
+    return opener
+
+
+def fetch(url: str, timeout: float, max_bytes: int, max_redirects: int = 3,
+          total_timeout: float | None = None) -> bytes:
+    """
+    Descarga `url` y devuelve el cuerpo; ProxyError si no se puede o no se debe.
+    `timeout` vale por operación de socket; `total_timeout` acota la descarga entera.
+    """
+    if urlsplit(url).scheme not in ("http", "https"):
+        raise ProxyError("Solo se admiten URLs http(s).", 400)
+    deadline = time.monotonic() + (total_timeout if total_timeout is not None else 3 * timeout)
+    req = urllib.request.Request(url, headers={"User-Agent": "catalog-image-proxy/1.0", "Accept": "image/*"})
+    try:
+        with _build_opener(max_redirects).open(req, timeout=timeout) as resp:
+            length = resp.headers.get("Content-Length")
+            if length and length.isdigit() and int(length) > max_bytes:
+                raise ProxyError("La imagen supera el tamaño máximo.", 413)
+            body = io.BytesIO()
+            while True:
+                if time.monotonic() > deadline:
+                    raise ProxyError("El origen tardó demasiado.", 504)
+                # read1: a lo sumo un recv, así el plazo se revisa entre cada uno
+                chunk = resp.read1(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if body.tell() + len(chunk) > max_bytes:
+                    raise ProxyError("La imagen supera el tamaño máximo.", 413)
+                body.write(chunk)
+            return body.getvalue()
+    except urllib.error.HTTPError as e:
+        raise ProxyError(f"El origen respondió {e.code}", 502) from None
+    except urllib.error.URLError as e:
+        if isinstance(e.reason, ProxyError):
+            raise e.reason from None
+        raise ProxyError(f"No se pudo descargar: {e.reason}", 502) from None
+    except (OSError, http.client.HTTPException) as e:
+        raise ProxyError(f"No se pudo descargar: {e}", 502) from None
+
+
+# ---------- Normalización ----------
+def render(data: bytes, width: int, fmt: str, max_pixels: int, quality: int = 80) -> bytes:
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            if im.format not in ALLOWED_FORMATS:
+                raise ProxyError("Formato de imagen no permitido.", 415)
+            if im.width * im.height > max_pixels:
+                raise ProxyError("La imagen tiene demasiados píxeles.", 413)
+            im = ImageOps.exif_transpose(im)
+            has_alpha = im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info)
+            if im.width > width:
+                im = im.resize((width, max(1, round(im.height * width / im.width))), Image.LANCZOS)
+            out = io.BytesIO()
+            if fmt == "webp":
+                im.convert("RGBA" if has_alpha else "RGB").save(out, "WEBP", quality=quality, method=4)
+            else:
+                im.convert("RGB").save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+            return out.getvalue()
+    except ProxyError:
+        raise
+    except (OSError, ValueError, Image.DecompressionBombError):
+        raise ProxyError("El origen no devolvió una imagen válida.", 415) from None
+
+
+# ---------- Caché en disco ----------
+class DiskLRU:
+    """
+    Caché en un directorio que comparten todos los workers. El uso se mide
+    en el directorio mismo, no en memoria de cada proceso (si no, el tope
+    real sería IMAGE_PROXY_CACHE_BYTES por cada worker): tras cada escritura
+    se recorre y, si pasa el tope, se borran los archivos de mtime más viejo.
+    Las escrituras solo ocurren en un fallo de caché, que ya descargó y
+    redimensionó una imagen, así que el recorrido no pesa.
+    """
+
+    PART_MAX_AGE = 3600   # temporales de una escritura interrumpida
+
+    def __init__(self):
+        self.folder = None
+        self.max_bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self._entries = self._bytes = 0      # última medición
+
+    def configure(self, folder: str, max_bytes: int):
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self._trim()
+
+    def path(self, name: str) -> str | None:
+        """Ruta del archivo si está en caché (y lo marca como recién usado)."""
+        full = os.path.join(self.folder, name)
+        try:
+            os.utime(full)
+        except OSError:
+            return None      # no está, u otro worker lo desalojó
+        return full
+
+    def put(self, name: str, payload: bytes) -> str:
+        fd, tmp = tempfile.mkstemp(dir=self.folder, suffix=".part")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(payload)
+        full = os.path.join(self.folder, name)
+        os.replace(tmp, full)
+        self._trim(keep=name)
+        return full
+
+    def _scan(self) -> list[tuple[float, str, int]]:
+        found = []
+        stale_part = time.time() - self.PART_MAX_AGE
+        for entry in os.scandir(self.folder):
+            try:
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+                if entry.name.endswith(".part"):
+                    if st.st_mtime < stale_part:
+                        os.remove(entry.path)
+                    continue
+            except FileNotFoundError:
+                continue
+            found.append((st.st_mtime, entry.name, st.st_size))
+        return found
+
+    def _trim(self, keep: str | None = None):
+        with self._lock:
+            found = self._scan()
+            total = sum(size for _mtime, _name, size in found)
+            entries = len(found)
+            for _mtime, name, size in sorted(found):
+                if total <= self.max_bytes:
+                    break
+                if name == keep:
+                    continue
+                try:
+                    os.remove(os.path.join(self.folder, name))
+                    self.evictions += 1
+                except FileNotFoundError:
+                    pass     # otro worker ya lo borró
+                total -= size
+                entries -= 1
+            self._entries, self._bytes = entries, total
+
+    def stats(self) -> dict:
+        return {"entries": self._entries, "bytes": self._bytes,
+                "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+
+# ---------- Proxy ----------
+class ImageProxy:
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.disk = DiskLRU()
+        self.failures = TTLCache(maxsize=1024, ttl=60)
+        self._key_locks: dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self.hits = self.misses = self.fetches = self.fetch_errors = self.fetched_bytes = 0
+
+    def init_app(self, app):
+        global _allow_private
+        self.app = app
+        self.enabled = Image is not None and app.config.get("IMAGE_PROXY_ENABLED", True)
+        if not self.enabled:
+            return False
+        _allow_private = app.config.get("IMAGE_PROXY_ALLOW_PRIVATE", False)
+        self.disk.configure(
+            app.config.get("IMAGE_PROXY_CACHE_DIR") or os.path.join(app.instance_path, "image_proxy"),
+            app.config.get("IMAGE_PROXY_CACHE_BYTES", 256 * 1024 * 1024),
+        )
+        self.failures.configure(maxsize=1024, ttl=app.config.get("IMAGE_PROXY_ERROR_TTL", 60))
+        app.add_url_rule("/_img", "image_proxy", self.view)
+        return True
+
+    def _config(self, key, default):
+        return self.app.config.get(key, default)
+
+    # ---------- URLs ----------
+    def _sign(self, url: str) -> str:
+        secret = (self._config("SECRET_KEY", None) or "").encode()
+        return hmac.new(secret, url.encode(), hashlib.sha256).hexdigest()[:32]
+
+    def _widths(self) -> tuple:
+        max_width = self._config("IMAGE_PROXY_MAX_WIDTH", DEFAULT_MAX_WIDTH)
+        widths = self._config("IMAGE_VARIANT_WIDTHS", DEFAULT_WIDTHS)
+        return tuple(sorted({w for w in widths if w < max_width} | {max_width}))
+
+    def url_for(self, url: str, width: int | None = None, external: bool = False) -> str:
+        params = {"u": url, "s": self._sign(url)}
+        if width:
+            # Se redondea al ancho permitido inmediato superior
+            params["w"] = next((w for w in self._widths() if w >= width), self._widths()[-1])
+        return url_for("image_proxy", _external=external, **params)
+
+    # ---------- Vista ----------
+    def view(self):
+        url = request.args.get("u", "")
+        if not url or not hmac.compare_digest(request.args.get("s", ""), self._sign(url)):
+            abort(404)
+        widths = self._widths()
+        width = request.args.get("w", type=int) or widths[-1]
+        if width not in widths:
+            abort(404)
+        fmt = "webp" if request.accept_mimetypes["image/webp"] else "jpg"
+        key = hashlib.sha256(url.encode()).hexdigest()
+        name = f"{key}-{width}.{fmt}"
+
+        path = self.disk.path(name)
+        if path is None:
+            try:
+                path = self._fill(url, key, name, width, fmt)
+            except ProxyError as e:
+                abort(e.status)
+        else:
+            self.hits += 1
+
+        resp = send_file(path, mimetype=f"image/{'webp' if fmt == 'webp' else 'jpeg'}",
+                         etag=name, conditional=True, max_age=self._config("IMAGE_PROXY_MAX_AGE", 7 * 86400))
+        resp.cache_control.public = True
+        resp.vary.add("Accept")
+        return resp
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            if len(self._key_locks) > 1024:
+                self._key_locks = {k: v for k, v in self._key_locks.items() if v.locked()}
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _fill(self, url: str, key: str, name: str, width: int, fmt: str) -> str:
+        # Un solo worker-hilo descarga cada URL; los demás esperan y reutilizan
+        with self._lock_for(key):
+            path = self.disk.path(name)
+            if path is not None:
+                self.hits += 1
+                return path
+            failed = self.failures.get(key)
+            if failed is not None:
+                raise ProxyError("Falló hace poco; se reintenta más tarde.", failed)
+            self.misses += 1
+            original = f"{key}.orig"
+            data = self._cached_original(original)
+            fetched = data is None
+            try:
+                if fetched:
+                    self.fetches += 1
+                    data = fetch(url, self._config("IMAGE_PROXY_TIMEOUT", 5),
+                                 self._config("IMAGE_PROXY_MAX_BYTES", 5 * 1024 * 1024),
+                                 self._config("IMAGE_PROXY_MAX_REDIRECTS", 3),
+                                 self._config("IMAGE_PROXY_TOTAL_TIMEOUT", 15))
+                    self.fetched_bytes += len(data)
+                payload = render(data, width, fmt, self._config("IMAGE_PROXY_MAX_PIXELS", 40_000_000))
+            except ProxyError as e:
+                self.fetch_errors += 1
+                self.failures.set(key, e.status)
+                log.warning("Proxy de imagen: %s (%s)", e, url)
+                raise
+            # El original se guarda solo si resultó ser una imagen válida
+            if fetched:
+                self.disk.put(original, data)
+            return self.disk.put(name, payload)
+
+    def _cached_original(self, name: str) -> bytes | None:
+        path = self.disk.path(name)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as fh:
+                return fh.read()
+        except OSError:
+            return None   # otro worker lo desalojó entre medio
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "fetches": self.fetches,
+            "fetch_errors": self.fetch_errors,
+            "fetched_bytes": self.fetched_bytes,
+            "disk": self.disk.stats(),
+        }
+
+
+image_proxy = ImageProxy()
@@ -0,0 +1,192 @@
+"""
+Variantes redimensionadas (WebP + JPEG) de las imágenes subidas.
+
+La petición solo guarda el original; el redimensionado corre en un pool de
+procesos (IMAGE_WORKERS) y, al terminar, se registran las rutas en
+Product.image_variants. Hasta entonces las plantillas usan el original.
+Si Pillow no está instalado las variantes simplemente no se generan.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - dependencia opcional
+    Image = None
+
+from flask import url_for
+
+log = logging.getLogger(__name__)
+
+DEFAULT_WIDTHS = (320, 640, 1024)
+FORMATS = {"webp": "WEBP", "jpg": "JPEG"}
+
+
+# ---------- Trabajo en el proceso hijo ----------
+def build_variants(src_abs: str, widths, quality: int = 80) -> dict:
+    """
+    Genera <stem>-<ancho>w.webp / .jpg junto al original.
+    Devuelve {"webp": {ancho: nombre}, "jpg": {ancho: nombre}} (nombres de archivo).
+    """
+    folder, filename = os.path.split(src_abs)
+    stem = filename.rsplit(".", 1)[0]
+    out = {fmt: {} for fmt in FORMATS}
+
+    with Image.open(src_abs) as im:
+        im = ImageOps.exif_transpose(im)
+        has_alpha = im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info)
+        # Nunca se agranda: los anchos mayores al original se reemplazan por el original
+        targets = sorted({min(w, im.width) for w in widths})
+
+        for width in targets:
+            height = max(1, round(im.height * width / im.width))
+            resized = im.resize((width, height), Image.LANCZOS) if width != im.width else im.copy()
+            for fmt, pil_format in FORMATS.items():
+                name = f"{stem}-{width}w.{fmt}"
+                dest = os.path.join(folder, name)
+                if pil_format == "JPEG":
+                    resized.convert("RGB").save(dest, pil_format, quality=quality, optimize=True, progressive=True)
+                else:
+                    img = resized.convert("RGBA" if has_alpha else "RGB")
+                    img.save(dest, pil_format, quality=quality, method=4)
+                out[fmt][width] = name
+    return out
+
+
+# ---------- Pool y registro ----------
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(app):
+    global _executor, _executor_pid
+    with _executor_lock:
+        # Tras un fork (gunicorn) el pool del padre no sirve en el hijo
+        if _executor is None or _executor_pid != os.getpid():
+            # forkserver/spawn: los hijos no heredan hilos, locks ni conexiones
+            # a la BD del worker (fork los copiaría a medio usar)
+            default = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _executor = ProcessPoolExecutor(
+                max_workers=app.config.get("IMAGE_WORKERS", 2),
+                mp_context=multiprocessing.get_context(app.config.get("IMAGE_MP_CONTEXT", default)),
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def enabled(app) -> bool:
+    return Image is not None and app.config.get("IMAGE_VARIANTS_ENABLED", True)
+
+
+def schedule_variants(app, product_id: int, rel_path: str):
+    """Encola el redimensionado de `rel_path` (relativo a static/) para el producto."""
+    if not rel_path or rel_path.startswith(("http://", "https://")) or not enabled(app):
+        return None
+
+    # Archivo compartido (misma foto en otro producto): se reutilizan sus variantes
+    if _reuse_variants(product_id, rel_path):
+        return None
+
+    src_abs = os.path.join(app.static_folder, rel_path)
+    future = _get_executor(app).submit(
+        build_variants,
+        src_abs,
+        tuple(app.config.get("IMAGE_VARIANT_WIDTHS", DEFAULT_WIDTHS)),
+        app.config.get("IMAGE_VARIANT_QUALITY", 80),
+    )
+    future.add_done_callback(lambda f: _record(app, product_id, rel_path, f))
+    return future
+
+
+def _reuse_variants(product_id: int, rel_path: str) -> bool:
+    from app import db
+    from app.models import Product
+
+    sibling = (db.session.query(Product.image_variants)
+               .filter(Product.image_url == rel_path,
+                       Product.id != product_id,
+                       Product.image_variants.isnot(None))
+               .first())
+    if sibling is None or not sibling.image_variants:
+        return False
+    (Product.query
+     .filter(Product.id == product_id)
+     .update({Product.image_variants: sibling.image_variants}, synchronize_session=False))
+    _touch_owner(product_id)
+    db.session.commit()
+    return True
+
+
+def _touch_owner(product_id: int):
+    # El srcset cambia el HTML del catálogo: nueva versión de la tienda
+    from app import db
+    from app.models import Product
+    from app.utils import store_stats
+
+    user_id = db.session.query(Product.user_id).filter(Product.id == product_id).scalar()
+    if user_id is not None:
+        store_stats.touch(user_id)
+
+
+def _record(app, product_id: int, rel_path: str, future):
+    from app import db
+    from app.models import Product
+
+    try:
+        result = future.result()
+    except Exception:
+        log.exception("No se pudieron generar variantes de %s", rel_path)
+        return
+
+    folder = rel_path.rsplit("/", 1)[0]
+    variants = {
+        fmt: {str(w): f"{folder}/{name}" for w, name in sizes.items()}
+        for fmt, sizes in result.items()
+    }
+    with app.app_context():
+        try:
+            # Solo si el producto sigue apuntando a la misma imagen
+            updated = (Product.query
+                       .filter(Product.id == product_id, Product.image_url == rel_path)
+                       .update({Product.image_variants: variants}, synchronize_session=False))
+            if updated:
+                _touch_owner(product_id)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            log.exception("No se pudieron registrar variantes del producto %s", product_id)
+        finally:
+            db.session.remove()
+
+
+def variant_paths(variants) -> list[str]:
+    """Rutas (relativas a static/) de todas las variantes registradas."""
+    if not variants:
+        return []
+    return [path for sizes in variants.values() for path in sizes.values()]
+
+
+# ---------- Helpers de plantillas ----------
+def image_srcset(product, fmt: str = "jpg") -> str:
+    variants = (product.image_variants or {}).get(fmt)
+    if not variants:
+        return ""
+    return ", ".join(
+        f"{url_for('static', filename=path)} {w}w"
+        for w, path in sorted(variants.items(), key=lambda kv: int(kv[0]))
+    )
+
+
+def image_thumb(product, min_width: int = 0) -> str | None:
+    """Ruta de la variante JPEG más chica que cubra `min_width`, o None."""
+    variants = (product.image_variants or {}).get("jpg")
+    if not variants:
+        return None
+    for w, path in sorted(variants.items(), key=lambda kv: int(kv[0])):
+        if int(w) >= min_width:
+            return path
+    return path
@@ -0,0 +1,167 @@
+"""
+Instrumentación opcional por petición (INSTRUMENTATION_ENABLED).
+
+Con eventos de SQLAlchemy y las señales de plantillas de Flask se mide, para
+cada petición: número de consultas, tiempo total en la BD, tiempo de render
+de Jinja y las consultas lentas (>= SLOW_QUERY_MS). El resultado sale en la
+cabecera Server-Timing (INSTRUMENTATION_SERVER_TIMING) y en una línea JSON
+del logger "app.instrumentation". Una fracción de las peticiones
+(PROFILE_SAMPLE_RATE, 0..1) se perfila con cProfile y se guarda en
+PROFILE_DIR como <fecha>-<endpoint>-<pid>.prof (ver con snakeviz o pstats).
+"""
+import cProfile
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime
+
+from flask import before_render_template, g, has_app_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger("app.instrumentation")
+
+_stats = {"requests": 0, "queries": 0, "slow_queries": 0, "profiles": 0}
+_slow_ms = 100
+
+
+class RequestStats:
+    __slots__ = ("start", "queries", "db_time", "tpl_time", "tpl_start", "slow", "profiler")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.tpl_time = 0.0
+        self.tpl_start = []
+        self.slow = []
+        self.profiler = None
+
+
+def _current():
+    return g.get("_instrumentation") if has_app_context() else None
+
+
+# ---------- SQL ----------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_instr_t0", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get("_instr_t0")
+    if not stack:
+        return
+    elapsed = time.perf_counter() - stack.pop()
+    stats = _current()
+    if stats is None:
+        return
+    stats.queries += 1
+    stats.db_time += elapsed
+    if elapsed * 1000 >= _slow_ms:
+        stats.slow.append({"ms": round(elapsed * 1000, 1), "sql": " ".join(statement.split())[:500]})
+
+
+# ---------- Plantillas ----------
+def _before_render(sender, template, context, **extra):
+    stats = _current()
+    if stats is not None:
+        stats.tpl_start.append(time.perf_counter())
+
+
+def _rendered(sender, template, context, **extra):
+    stats = _current()
+    if stats is not None and stats.tpl_start:
+        stats.tpl_time += time.perf_counter() - stats.tpl_start.pop()
+
+
+# ---------- Petición ----------
+def init_app(app):
+    global _slow_ms
+    if not app.config.get("INSTRUMENTATION_ENABLED", False):
+        return False
+
+    _slow_ms = app.config.get("SLOW_QUERY_MS", 100)
+    sample_rate = app.config.get("PROFILE_SAMPLE_RATE", 0.0)
+    profile_dir = app.config.get("PROFILE_DIR") or os.path.join(app.instance_path, "profiles")
+    server_timing = app.config.get("INSTRUMENTATION_SERVER_TIMING", True)
+    if log.level == logging.NOTSET:
+        log.setLevel(logging.INFO)
+
+    # A nivel de clase: cubre todos los engines (también réplicas)
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+
+    @app.before_request
+    def _instrument_start():
+        stats = g._instrumentation = RequestStats()
+        if sample_rate and random.random() < sample_rate:
+            stats.profiler = cProfile.Profile()
+            stats.profiler.enable()
+
+    @app.after_request
+    def _instrument_finish(response):
+        stats = g.pop("_instrumentation", None)
+        if stats is None:
+            return response
+        total = time.perf_counter() - stats.start
+        _stats["requests"] += 1
+        _stats["queries"] += stats.queries
+        _stats["slow_queries"] += len(stats.slow)
+
+        if server_timing:
+            response.headers.add(
+                "Server-Timing",
+                f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+                f"tpl;dur={stats.tpl_time * 1000:.1f}, total;dur={total * 1000:.1f}",
+            )
+
+        profile_path = None
+        if stats.profiler is not None:
+            stats.profiler.disable()
+            profile_path = _dump_profile(stats.profiler, profile_dir)
+
+        log.info(json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "endpoint": request.endpoint,
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 1),
+            "db_ms": round(stats.db_time * 1000, 1),
+            "queries": stats.queries,
+            "tpl_ms": round(stats.tpl_time * 1000, 1),
+            "slow": stats.slow,
+            "profile": profile_path,
+        }, ensure_ascii=False))
+        return response
+
+    @app.teardown_request
+    def _instrument_teardown(exc):
+        # Si la vista falló no hubo after_request: se apaga el perfilador igual
+        stats = g.pop("_instrumentation", None)
+        if stats is not None and stats.profiler is not None:
+            stats.profiler.disable()
+
+    return True
+
+
+def _dump_profile(profiler, folder) -> str | None:
+    try:
+        os.makedirs(folder, exist_ok=True)
+        endpoint = (request.endpoint or "none").replace(".", "_")
+        name = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{endpoint}-{os.getpid()}.prof"
+        path = os.path.join(folder, name)
+        profiler.dump_stats(path)
+        _stats["profiles"] += 1
+        return path
+    except OSError:
+        log.exception("No se pudo guardar el perfil")
+        return None
+
+
+def stats() -> dict:
+    return dict(_stats)
@@ -0,0 +1,29 @@
+"""
+Serialización JSON rápida para la API pública.
+
+Usa orjson si está instalado (varias veces más rápido que json y devuelve
+bytes directamente); si no, json de la librería estándar con separadores
+compactos. Decimal se emite como texto para no perder precisión.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"No serializable: {type(value).__name__}")
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
@@ -0,0 +1,15 @@
+"""
+Registro de métricas internas por proceso (cachés, colas, pools...).
+
+Cada subsistema registra una función sin argumentos que devuelve un dict;
+el endpoint /_metrics las recolecta todas.
+"""
+_providers = {}
+
+
+def register(name: str, provider):
+    _providers[name] = provider
+
+
+def collect() -> dict:
+    return {name: provider() for name, provider in _providers.items()}
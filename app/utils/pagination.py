@@ -0,0 +1,177 @@
+"""
+Paginación por cursor (keyset / seek).
+
+En lugar de OFFSET, cada página se pide "después de" o "antes de" la última
+fila vista, usando las columnas del ORDER BY como clave. Así la página N
+cuesta lo mismo que la primera y no hace falta ningún COUNT.
+"""
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import and_, or_
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+# ---------- Codificación de cursores ----------
+def _dump(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    return value
+
+
+def _load(value):
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        if "dec" in value:
+            return Decimal(value["dec"])
+    return value
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps([_dump(v) for v in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _column_type(col):
+    try:
+        return col.type.python_type
+    except NotImplementedError:
+        return None
+
+
+def _valid_value(value, expected, nullable: bool) -> bool:
+    if value is None:
+        return nullable
+    if expected is None:
+        return True
+    if expected is int:
+        return isinstance(value, int) and not isinstance(value, bool)
+    if expected is Decimal:
+        return isinstance(value, Decimal) and value.is_finite()
+    if expected is date:
+        return type(value) is date
+    return isinstance(value, expected)
+
+
+def decode_cursor(token: str, order) -> list:
+    """Decodifica el cursor y comprueba cada valor contra su columna de orden."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = [_load(v) for v in json.loads(raw)]
+    except (ValueError, TypeError, InvalidOperation):
+        raise InvalidCursor("Cursor inválido.")
+    if len(values) != len(order):
+        raise InvalidCursor("Cursor inválido.")
+    for value, (col, _desc) in zip(values, order):
+        if not _valid_value(value, _column_type(col), getattr(col, "nullable", True)):
+            raise InvalidCursor("Cursor inválido.")
+    return values
+
+
+# ---------- Paginación ----------
+class KeysetPage:
+    """Página de resultados con cursores para la anterior / siguiente."""
+
+    def __init__(self, items, keys, has_next, has_prev):
+        self.items = items
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self._keys = keys
+
+    def _cursor(self, row):
+        return encode_cursor([getattr(row, k) for k in self._keys])
+
+    @property
+    def next_cursor(self):
+        return self._cursor(self.items[-1]) if self.has_next and self.items else None
+
+    @property
+    def prev_cursor(self):
+        return self._cursor(self.items[0]) if self.has_prev and self.items else None
+
+    def next_args(self):
+        return {"after": self.next_cursor}
+
+    def prev_args(self):
+        return {"before": self.prev_cursor}
+
+
+def _seek_predicate(order, values, forward: bool):
+    """
+    (a, b, c) "después de" (x, y, z) respetando la dirección de cada columna:
+    a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+    """
+    clauses = []
+    for i, (col, desc) in enumerate(order):
+        after = (col < values[i]) if desc == forward else (col > values[i])
+        eqs = [order[j][0] == values[j] for j in range(i)]
+        clauses.append(and_(*eqs, after))
+    return or_(*clauses)
+
+
+def keyset_query(query, order, per_page: int, after: str | None = None, before: str | None = None):
+    """Aplica el cursor, el orden y el LIMIT (per_page + 1) sin ejecutar la consulta."""
+    forward = not before
+    token = after if forward else before
+
+    if token:
+        values = decode_cursor(token, order)
+        query = query.filter(_seek_predicate(order, values, forward))
+
+    if forward:
+        query = query.order_by(*[c.desc() if d else c.asc() for c, d in order])
+    else:
+        query = query.order_by(*[c.asc() if d else c.desc() for c, d in order])
+    return query.limit(per_page + 1)
+
+
+def keyset_paginate(query, order, per_page: int, after: str | None = None, before: str | None = None):
+    """
+    `order` es una lista de (columna, descendente) que debe terminar en una
+    columna única (el id) para que el orden sea total.
+    """
+    keys = [col.key for col, _ in order]
+    forward = not before
+    token = after if forward else before
+
+    rows = keyset_query(query, order, per_page, after=after, before=before).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if forward:
+        return KeysetPage(rows, keys, has_next=more, has_prev=bool(token))
+    rows.reverse()
+    return KeysetPage(rows, keys, has_next=True, has_prev=more)
+
+
+class OffsetPage:
+    """Página por número (OFFSET) sin COUNT; se usa solo para conjuntos acotados."""
+
+    def __init__(self, items, page, has_next):
+        self.items = items
+        self.page = page
+        self.has_next = has_next
+        self.has_prev = page > 1
+
+    def next_args(self):
+        return {"page": self.page + 1}
+
+    def prev_args(self):
+        return {"page": self.page - 1}
+
+
+def offset_paginate(query, page: int, per_page: int):
+    rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+    return OffsetPage(rows[:per_page], page, has_next=len(rows) > per_page)
@@ -0,0 +1,134 @@
+"""
+Hash y verificación de contraseñas fuera del worker web.
+
+generate_password_hash/check_password_hash son lentos a propósito; aquí corren
+en un pool de procesos acotado (HASH_WORKERS) y con un máximo de tareas en
+vuelo (HASH_MAX_PENDING): si el pool está saturado se espera a lo sumo
+HASH_QUEUE_TIMEOUT segundos y luego se rechaza con HasherBusy, en lugar de
+acumular logins detrás de los que ya están esperando. El algoritmo y su costo
+salen de PASSWORD_HASH_METHOD (formato de werkzeug, ej. "scrypt:32768:8:1"
+o "pbkdf2:sha256:1000000"); los hashes con otros parámetros se rehacen en el
+próximo login correcto. Con HASH_WORKERS = 0 todo corre en línea.
+
+Los procesos del pool se crean con forkserver (spawn donde no existe;
+HASH_MP_CONTEXT para otro), nunca con fork desde un worker con hilos.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(RuntimeError):
+    pass
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(0, min(len(values) - 1, int(round(pct / 100 * (len(values) - 1)))))]
+
+
+class PasswordHasher:
+
+    def __init__(self):
+        self.method = "scrypt"
+        self.workers = 2
+        self.mp_context = None
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._slots = None
+        self._prefix = None
+        self.pending = 0
+        self.hashes = self.verifies = self.rehashes = self.rejected = 0
+        self._latencies = deque(maxlen=1000)
+
+    def init_app(self, app):
+        self.method = app.config.get("PASSWORD_HASH_METHOD", "scrypt")
+        self.workers = app.config.get("HASH_WORKERS", 2)
+        default = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self.mp_context = app.config.get("HASH_MP_CONTEXT", default)
+        self.max_pending = app.config.get("HASH_MAX_PENDING", max(1, self.workers) * 8)
+        self.queue_timeout = app.config.get("HASH_QUEUE_TIMEOUT", 5.0)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._prefix = None
+
+    # ---------- Pool ----------
+    def _get_executor(self):
+        # Tras un fork (gunicorn) el pool del padre no sirve en el hijo
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.mp_context),
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _incr(self, counter: str, delta: int = 1):
+        # Los contadores se tocan desde todos los hilos del worker
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + delta)
+
+    def record_rehash(self):
+        self._incr("rehashes")
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            t0 = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self._latencies.append(time.perf_counter() - t0)
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self._incr("rejected")
+            raise HasherBusy("Demasiadas solicitudes de autenticación en curso.")
+        t0 = time.perf_counter()
+        self._incr("pending")
+        try:
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            self._incr("pending", -1)
+            self._slots.release()
+            self._latencies.append(time.perf_counter() - t0)
+
+    # ---------- API ----------
+    def hash(self, password: str) -> str:
+        self._incr("hashes")
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        self._incr("verifies")
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        """¿El hash guardado usa otro algoritmo/costo que PASSWORD_HASH_METHOD?"""
+        if self._prefix is None:
+            # "scrypt" se guarda como "scrypt:32768:8:1": se normaliza con un hash real
+            self._prefix = self.hash("").split("$", 1)[0]
+        return pwhash.split("$", 1)[0] != self._prefix
+
+    def stats(self) -> dict:
+        latencies = list(self._latencies)
+        return {
+            "method": self.method,
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": getattr(self, "max_pending", 0),
+            "hashes": self.hashes,
+            "verifies": self.verifies,
+            "rehashes": self.rehashes,
+            "rejected": self.rejected,
+            "latency_p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+            "latency_p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+        }
+
+
+hasher = PasswordHasher()
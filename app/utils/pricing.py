@@ -0,0 +1,250 @@
+"""
+Precio efectivo de los productos (columna products.effective_price).
+
+`price` es el precio con descuento y `original_price` el precio normal; el
+descuento solo rige entre discount_start y discount_end (ambos inclusive,
+vacío = sin límite). El precio vigente se guarda en `effective_price` al
+crear/editar, y `apply_discounts` lo actualiza en lotes cuando una ventana
+abre o cierra, así el orden por precio usa un índice en vez de evaluar las
+fechas fila por fila en cada petición.
+
+El cambio de día se aplica con `flask apply-discounts` (cron a las 00:00) o
+con el hilo opcional DISCOUNT_SCHEDULER_ENABLED. Cada pasada solo mira las
+ventanas que abrieron o cerraron desde la anterior (índices sobre
+discount_start / discount_end), no todos los productos con descuento.
+
+El hilo arranca con la primera petición de cada proceso, no en create_app:
+con preload_app create_app corre en el maestro de gunicorn, que no atiende
+peticiones y cuyos hilos no pasan a los workers. Cada worker tiene su hilo,
+pero un flock sobre DISCOUNT_SCHEDULER_LOCK hace que en cada máquina solo
+uno aplique cada pasada, y el mismo archivo guarda el último día aplicado:
+un worker que arranca (o se recicla por max_requests) a media jornada no
+repite la pasada de hoy. apply_discounts es idempotente, así que varias
+máquinas o un cron a la vez no hacen daño.
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: sin exclusión entre procesos
+    fcntl = None
+
+from sqlalchemy import and_, case, or_
+
+log = logging.getLogger(__name__)
+
+
+def _get(obj, name):
+    return obj.get(name) if isinstance(obj, dict) else getattr(obj, name)
+
+
+def discount_active(obj, today: date | None = None) -> bool:
+    today = today or date.today()
+    start = _get(obj, "discount_start")
+    end = _get(obj, "discount_end")
+    return (start is None or start <= today) and (end is None or end >= today)
+
+
+def effective_price(obj, today: date | None = None):
+    """Precio vigente de un producto (objeto o dict de columnas)."""
+    price = _get(obj, "price")
+    original = _get(obj, "original_price")
+    if original is None or discount_active(obj, today):
+        return price
+    return original
+
+
+def _effective_expr(today: date):
+    from app.models import Product
+
+    return case(
+        (Product.original_price.is_(None), Product.price),
+        (and_(or_(Product.discount_start.is_(None), Product.discount_start <= today),
+              or_(Product.discount_end.is_(None), Product.discount_end >= today)),
+         Product.price),
+        else_=Product.original_price,
+    )
+
+
+def stale_products(today: date, since: date | None = None, full: bool = False):
+    """
+    (id, user_id) de los productos cuyo effective_price quedó viejo al llegar
+    `today`.
+
+    El precio vigente solo cambia el día que una ventana abre (discount_start)
+    o el siguiente al que cierra (discount_end), así que basta mirar las
+    ventanas que abrieron o cerraron después de `since` (el último día ya
+    aplicado; por defecto ayer), con los índices de esas columnas. `full`
+    revisa todas las ventanas (para reparar datos a mano).
+    """
+    from app import db
+    from app.models import Product
+
+    if full:
+        window = or_(Product.discount_start.isnot(None), Product.discount_end.isnot(None))
+    else:
+        since = since if since is not None else today - timedelta(days=1)
+        window = or_(and_(Product.discount_start > since, Product.discount_start <= today),
+                     and_(Product.discount_end >= since, Product.discount_end < today))
+    return (db.session.query(Product.id, Product.user_id)
+            .filter(window,
+                    Product.original_price.isnot(None),
+                    Product.effective_price != _effective_expr(today)))
+
+
+def apply_discounts(today: date | None = None, batch_size: int = 1000,
+                    since: date | None = None, full: bool = False) -> tuple[int, set]:
+    """
+    Pone al día effective_price de los productos cuya ventana de descuento
+    abrió o cerró desde `since` (ver stale_products). Hace commit por lote;
+    devuelve (productos cambiados, ids de tiendas afectadas).
+    """
+    from app import db
+    from app.models import Product
+    from app.utils import store_stats
+
+    today = today or date.today()
+    expr = _effective_expr(today)
+    # Se leen todos de una vez (por los índices de fechas; son los de un día):
+    # recorrer por id > último haría que el planificador caminara la PK entera
+    rows = stale_products(today, since, full).all()
+
+    stores = set()
+    for i in range(0, len(rows), batch_size):
+        batch = rows[i:i + batch_size]
+        ids = [r.id for r in batch]
+        batch_stores = {r.user_id for r in batch}
+        (Product.query
+         .filter(Product.id.in_(ids))
+         .update({Product.effective_price: expr}, synchronize_session=False))
+        # on_discount depende del precio vigente; la versión de la tienda
+        # cambia el validador HTTP del catálogo
+        store_stats.reconcile(batch_stores)
+        store_stats.touch(batch_stores)
+        db.session.commit()
+        stores |= batch_stores
+    return len(rows), stores
+
+
+class DiscountScheduler:
+    """Ejecuta apply_discounts al arrancar y justo después de cada medianoche."""
+
+    def __init__(self):
+        self.app = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.runs = self.changed = self.failed = self.skipped = 0
+        self.last_run = None
+
+    def init_app(self, app):
+        self.app = app
+        if app.config.get("DISCOUNT_SCHEDULER_ENABLED", False):
+            app.before_request(self._ensure_started)
+
+    def _ensure_started(self):
+        if self._pid != os.getpid():
+            self.start()
+
+    def start(self):
+        # Un hilo por proceso: tras un fork el del padre no existe en el hijo
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="discount-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _seconds_until_midnight(self) -> float:
+        now = datetime.now()
+        tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        return (tomorrow - now).total_seconds() + 1
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self._seconds_until_midnight())
+
+    @contextmanager
+    def _exclusive(self):
+        """
+        Archivo de turno abierto y con flock tomado (no bloqueante), o None si
+        otro proceso lo tiene. Su contenido es el último día aplicado.
+        """
+        path = self.app.config.get("DISCOUNT_SCHEDULER_LOCK",
+                                   os.path.join(tempfile.gettempdir(), "discount-scheduler.lock"))
+        with open(path, "a+", encoding="ascii") as fh:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    yield None
+                    return
+            try:
+                yield fh
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _last_day(fh) -> date | None:
+        fh.seek(0)
+        try:
+            return date.fromisoformat(fh.read().strip())
+        except ValueError:
+            return None
+
+    def run_once(self):
+        from app import db
+
+        today = date.today()
+        with self._exclusive() as marker:
+            if marker is None:
+                self.skipped += 1      # otro worker de esta máquina ya la está aplicando
+                return
+            last_day = self._last_day(marker)
+            if last_day is not None and last_day >= today:
+                self.skipped += 1      # ya aplicada hoy (worker nuevo o reciclado)
+                return
+            with self.app.app_context():
+                try:
+                    changed, _ = apply_discounts(
+                        today, batch_size=self.app.config.get("DISCOUNT_BATCH_SIZE", 1000),
+                        # sin marca (primera pasada en esta máquina) no se sabe qué días faltan
+                        since=last_day, full=last_day is None)
+                    self.changed += changed
+                    self.runs += 1
+                    self.last_run = time.time()
+                    marker.truncate(0)     # "a+": la escritura va al final, que ahora es 0
+                    marker.write(today.isoformat())
+                    marker.flush()
+                except Exception:
+                    db.session.rollback()
+                    self.failed += 1
+                    log.exception("No se pudieron aplicar los descuentos programados")
+                finally:
+                    db.session.remove()
+
+    def stats(self) -> dict:
+        return {
+            "running": self._pid == os.getpid() and self._thread is not None and self._thread.is_alive(),
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "changed": self.changed,
+            "failed": self.failed,
+            "last_run_age_seconds": round(time.time() - self.last_run, 1) if self.last_run else None,
+        }
+
+
+discount_scheduler = DiscountScheduler()
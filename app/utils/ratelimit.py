@@ -0,0 +1,165 @@
+"""
+Limitador de intentos para login, registro y el chequeo de subdominio (token bucket).
+
+Cada clave (IP o email normalizado; login y registro tienen ambas) tiene un balde de `limit` fichas que se
+rellena a razón de limit/periodo; un intento sin ficha se rechaza con 429
+antes de consultar la base de datos o calcular un hash. Las reglas se
+escriben como "5/minute", "100/hour", etc.
+
+Por defecto el estado vive en memoria del proceso (cada worker cuenta por su
+lado, hasta RATELIMIT_MAX_KEYS claves). Con RATELIMIT_STORAGE_URL =
+"redis://..." se comparte entre workers; si el paquete redis no está
+instalado se sigue en memoria.
+
+Las claves por IP usan request.remote_addr. Detrás de un proxy inverso hay
+que definir PROXY_FIX_X_FOR (número de proxies de confianza, ver
+create_app): sin él todos los clientes comparten la IP del proxy y un solo
+atacante agota el balde de todos.
+"""
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - dependencia opcional
+    redis = None
+
+log = logging.getLogger(__name__)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_rule(rule: str) -> tuple[int, int]:
+    """Convierte "5/minute" en (5, 60)."""
+    count, _, period = rule.partition("/")
+    period = period.strip().rstrip("s")
+    if period not in _PERIODS:
+        raise ValueError(f"Regla de límite inválida: {rule!r}")
+    return int(count), _PERIODS[period]
+
+
+# ---------- Backends ----------
+class MemoryBackend:
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, period: int) -> float:
+        """Consume una ficha; devuelve 0 si se permite o los segundos a esperar."""
+        rate = limit / period
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (float(limit), now))
+            tokens = min(float(limit), tokens + (now - last) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                retry_after = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                retry_after = (1 - tokens) / rate
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._buckets)
+
+
+class RedisBackend:
+    """Mismo token bucket, atómico en Redis con un script Lua."""
+
+    _SCRIPT = """
+    local limit = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local state = redis.call('HMGET', KEYS[1], 't', 'ts')
+    local tokens = tonumber(state[1]) or limit
+    local last = tonumber(state[2]) or now
+    tokens = math.min(limit, tokens + (now - last) * rate)
+    local retry = 0
+    if tokens >= 1 then tokens = tokens - 1 else retry = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 't', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(limit / rate) + 1)
+    return tostring(retry)
+    """
+
+    def __init__(self, url: str, prefix: str = "rl:"):
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(self._SCRIPT)
+
+    def hit(self, key: str, limit: int, period: int) -> float:
+        return float(self._script(keys=[self.prefix + key], args=[limit, limit / period, time.time()]))
+
+    def size(self) -> int | None:
+        return None
+
+
+# ---------- Limitador ----------
+class RateLimiter:
+
+    def __init__(self):
+        self.enabled = True
+        self.backend = MemoryBackend()
+        self.rules: dict[str, tuple[int, int]] = {}
+        self.allowed: dict[str, int] = {}
+        self.shed: dict[str, int] = {}
+        self.errors = 0
+        self._lock = threading.Lock()   # contadores (los hilos del worker los comparten)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("RATELIMIT_ENABLED", True)
+        self.rules = {
+            "login_ip": parse_rule(app.config.get("LOGIN_RATE_LIMIT_IP", "30/minute")),
+            "login_email": parse_rule(app.config.get("LOGIN_RATE_LIMIT_EMAIL", "5/minute")),
+            "register_ip": parse_rule(app.config.get("REGISTER_RATE_LIMIT_IP", "10/hour")),
+            "register_email": parse_rule(app.config.get("REGISTER_RATE_LIMIT_EMAIL", "3/hour")),
+            "subdomain_check_ip": parse_rule(app.config.get("SUBDOMAIN_CHECK_RATE_LIMIT_IP", "60/minute")),
+        }
+        url = app.config.get("RATELIMIT_STORAGE_URL")
+        if url and url.startswith("redis") and redis is not None:
+            self.backend = RedisBackend(url)
+        else:
+            if url and redis is None:
+                log.warning("RATELIMIT_STORAGE_URL definido pero falta el paquete redis; se usa memoria")
+            self.backend = MemoryBackend(app.config.get("RATELIMIT_MAX_KEYS", 100000))
+
+    def check(self, rule: str, value: str | None) -> int:
+        """0 si el intento pasa; si no, segundos (redondeados hacia arriba) para reintentar."""
+        if not self.enabled or not value or rule not in self.rules:
+            return 0
+        limit, period = self.rules[rule]
+        try:
+            retry_after = self.backend.hit(f"{rule}:{value}", limit, period)
+        except Exception:
+            # Si el backend compartido falla, mejor dejar pasar que tumbar el login
+            with self._lock:
+                self.errors += 1
+            log.exception("Fallo del backend de límites")
+            return 0
+        counter = self.shed if retry_after > 0 else self.allowed
+        with self._lock:
+            counter[rule] = counter.get(rule, 0) + 1
+        return max(1, math.ceil(retry_after)) if retry_after > 0 else 0
+
+    def stats(self) -> dict:
+        keys = self.backend.size()
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "backend": type(self.backend).__name__,
+                "keys": keys,
+                "allowed": dict(self.allowed),
+                "shed": dict(self.shed),
+                "errors": self.errors,
+            }
+
+
+limiter = RateLimiter()
@@ -0,0 +1,179 @@
+"""
+Lecturas del catálogo público en réplicas de solo lectura.
+
+SQLALCHEMY_REPLICA_URIS es una lista de URIs; cada una se registra como bind
+"replica_<n>" de Flask-SQLAlchemy. Durante las peticiones GET/HEAD de los
+blueprints de REPLICA_BLUEPRINTS (por defecto solo "public"), RoutingSession
+envía los SELECT a una réplica (round robin); escrituras, flush, SELECT ...
+FOR UPDATE y todo lo que corre fuera de esas peticiones (dashboard, CLI,
+hilos de fondo) sigue en la primaria.
+
+- Read-your-writes: si una petición escribió en la primaria, una cookie
+  propia (_db_primary_until, con max_age = REPLICA_READ_YOUR_WRITES_SECONDS)
+  hace que durante ese tiempo las lecturas de ese navegador vayan a la
+  primaria (el dueño ve enseguida lo que acaba de editar). No se usa la
+  sesión de Flask: leerla en los GET públicos añadiría Vary: Cookie y
+  rompería la caché compartida del catálogo. Falsificar la cookie solo
+  consigue leer de la primaria.
+- Caída: un error de conexión en una réplica la saca de la rotación por
+  REPLICA_RETRY_SECONDS y la consulta se reintenta una vez en la primaria;
+  sin réplicas sanas se lee de la primaria.
+
+Para probar en local basta con dos archivos SQLite:
+    cp app.db replica.db
+    SQLALCHEMY_REPLICA_URIS = ["sqlite:///replica.db"]
+"""
+import itertools
+import threading
+import time
+
+from flask import current_app, g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, exc
+
+_COOKIE = "_db_primary_until"
+
+
+class ReplicaRouter:
+
+    def __init__(self):
+        self.keys: list[str] = []
+        self._cycle = None
+        self._lock = threading.Lock()
+        self._down_until: dict[str, float] = {}
+        self.blueprints = ("public",)
+        self.window = 10
+        self.retry = 30
+        self.replica_reads = self.primary_reads = self.failures = self.retries = 0
+
+    def configure(self, app):
+        """Registra las réplicas como binds; llamar antes de db.init_app."""
+        uris = app.config.get("SQLALCHEMY_REPLICA_URIS") or []
+        if isinstance(uris, str):
+            uris = [u.strip() for u in uris.split(",") if u.strip()]
+        binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+        self.keys = []
+        for i, uri in enumerate(uris):
+            key = f"replica_{i}"
+            binds[key] = uri
+            self.keys.append(key)
+        app.config["SQLALCHEMY_BINDS"] = binds
+        self._cycle = itertools.cycle(self.keys) if self.keys else None
+        self.blueprints = tuple(app.config.get("REPLICA_BLUEPRINTS", ("public",)))
+        self.window = app.config.get("REPLICA_READ_YOUR_WRITES_SECONDS", 10)
+        self.retry = app.config.get("REPLICA_RETRY_SECONDS", 30)
+
+    def init_app(self, app, db):
+        if not self.keys:
+            return
+        with app.app_context():
+            for key in self.keys:
+                event.listen(db.engines[key], "handle_error", self._make_error_handler(key))
+
+        @app.before_request
+        def _route_reads():
+            if request.method in ("GET", "HEAD") and request.blueprint in self.blueprints:
+                self.route_to_replica()
+
+        @app.after_request
+        def _remember_writes(response):
+            if g.get("_db_wrote") and response.status_code < 400:
+                response.set_cookie(
+                    _COOKIE, str(int(time.time() + self.window)), max_age=self.window,
+                    httponly=True, samesite="Lax",
+                    secure=current_app.config.get("SESSION_COOKIE_SECURE", False),
+                )
+            return response
+
+    def route_to_replica(self):
+        """Marca la petición actual como de solo lectura (salvo read-your-writes)."""
+        if not self.keys:
+            return
+        try:
+            primary_until = float(request.cookies.get(_COOKIE, 0))
+        except ValueError:
+            primary_until = 0
+        if primary_until < time.time():
+            g._db_use_replica = True
+
+    # ---------- Selección ----------
+    def pick(self, engines):
+        now = time.time()
+        with self._lock:
+            for _ in range(len(self.keys)):
+                key = next(self._cycle)
+                if self._down_until.get(key, 0) <= now:
+                    self.replica_reads += 1
+                    return engines[key]
+            self.primary_reads += 1
+        return None
+
+    def _make_error_handler(self, key):
+        def on_error(ctx):
+            if ctx.is_disconnect or isinstance(ctx.sqlalchemy_exception, exc.OperationalError):
+                with self._lock:
+                    self._down_until[key] = time.time() + self.retry
+                    self.failures += 1
+        return on_error
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            "replicas": len(self.keys),
+            "down": [k for k, until in self._down_until.items() if until > now],
+            "replica_reads": self.replica_reads,
+            "primary_fallbacks": self.primary_reads,
+            "failures": self.failures,
+            "primary_retries": self.retries,
+        }
+
+
+router = ReplicaRouter()
+
+
+def _is_plain_read(clause) -> bool:
+    return bool(getattr(clause, "is_select", False)) and getattr(clause, "_for_update_arg", None) is None
+
+
+class RoutingSession(Session):
+    """Session de Flask-SQLAlchemy que manda los SELECT marcados a una réplica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        read = bind is None and not self._flushing and _is_plain_read(clause)
+        if has_app_context():
+            g.pop("_db_on_replica", None)
+        if read and router.keys and has_app_context() and g.get("_db_use_replica"):
+            engine = router.pick(self._db.engines)
+            if engine is not None:
+                g._db_on_replica = True
+                return engine
+        if not read and has_app_context():
+            # Tras una escritura el resto de la petición lee de la primaria
+            g._db_wrote = True
+            g.pop("_db_use_replica", None)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _retry_on_primary(self, method, *args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except exc.DBAPIError as err:
+            if not (has_app_context() and g.pop("_db_on_replica", False)):
+                raise
+            if not (err.connection_invalidated or isinstance(err, exc.OperationalError)):
+                raise
+            # La réplica ya quedó fuera de rotación (handle_error); el resto de
+            # la petición lee de la primaria
+            g.pop("_db_use_replica", None)
+            with router._lock:
+                router.retries += 1
+            self.rollback()
+            return method(*args, **kwargs)
+
+    def execute(self, *args, **kwargs):
+        return self._retry_on_primary(super().execute, *args, **kwargs)
+
+    def scalar(self, *args, **kwargs):
+        return self._retry_on_primary(super().scalar, *args, **kwargs)
+
+    def scalars(self, *args, **kwargs):
+        return self._retry_on_primary(super().scalars, *args, **kwargs)
@@ -0,0 +1,244 @@
+"""
+Índice invertido en memoria para la búsqueda del catálogo público.
+
+Cada tienda tiene su propio índice (token -> {product_id: peso}) que se
+construye perezosamente la primera vez que alguien busca en ella y se
+mantiene sincronizado desde el dashboard (crear / editar / eliminar).
+Como cada worker tiene su propia copia, el índice guarda la
+catalog_version de la tienda con la que se construyó y se reconstruye
+cuando el catálogo trae otra (la misma que cambia el ETag y las claves de
+catalog_cache); SEARCH_INDEX_TTL queda como red de seguridad.
+
+Cada tienda tiene su propio lock: una búsqueda solo espera a otras de la
+misma tienda, y el índice se construye fuera de cualquier lock compartido.
+"""
+import math
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import OrderedDict
+
+from flask import current_app
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# El nombre pesa más que la descripción al calcular la relevancia
+NAME_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+
+
+def tokenize(text: str | None) -> list[str]:
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _weights(name: str | None, description: str | None) -> dict[str, int]:
+    out: dict[str, int] = {}
+    for tok in tokenize(name):
+        out[tok] = out.get(tok, 0) + NAME_WEIGHT
+    for tok in tokenize(description):
+        out[tok] = out.get(tok, 0) + DESCRIPTION_WEIGHT
+    return out
+
+
+class StoreIndex:
+    """Índice de una sola tienda."""
+
+    def __init__(self):
+        self.postings: dict[str, dict[int, int]] = {}
+        self.docs: dict[int, dict[str, int]] = {}
+        self._vocab: list[str] | None = None  # vocabulario ordenado para prefijos
+        self.built_at = time.monotonic()
+        self.version = None
+        self.lock = threading.Lock()
+
+    def add(self, product_id: int, name: str | None, description: str | None):
+        self.remove(product_id)
+        weights = _weights(name, description)
+        self.docs[product_id] = weights
+        for tok, w in weights.items():
+            if tok not in self.postings:
+                self.postings[tok] = {}
+                self._vocab = None
+            self.postings[tok][product_id] = w
+
+    def advance(self, version):
+        """Tras aplicar un cambio: si era el único desde la construcción, el índice sigue vigente."""
+        if version is not None and self.version is not None and version == self.version + 1:
+            self.version = version
+
+    def remove(self, product_id: int):
+        weights = self.docs.pop(product_id, None)
+        if not weights:
+            return
+        for tok in weights:
+            plist = self.postings.get(tok)
+            if plist is None:
+                continue
+            plist.pop(product_id, None)
+            if not plist:
+                del self.postings[tok]
+                self._vocab = None
+
+    def _expand_prefix(self, prefix: str, limit: int) -> list[str]:
+        if self._vocab is None:
+            self._vocab = sorted(self.postings)
+        vocab = self._vocab
+        out = []
+        i = bisect_left(vocab, prefix)
+        while i < len(vocab) and vocab[i].startswith(prefix) and len(out) < limit:
+            out.append(vocab[i])
+            i += 1
+        return out
+
+    def scores(self, query: str, prefix_expansions: int = 50) -> dict[int, float]:
+        """
+        {product_id: score} de todos los productos que coinciden, sin ordenar.
+        Todos los términos deben aparecer (AND); el último se trata como
+        prefijo para que las búsquedas mientras se escribe funcionen.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return {}
+
+        n_docs = max(1, len(self.docs))
+        scores: dict[int, float] | None = None
+        for pos, term in enumerate(terms):
+            if pos == len(terms) - 1:
+                expanded = self._expand_prefix(term, prefix_expansions)
+            else:
+                expanded = [term] if term in self.postings else []
+            if not expanded:
+                return {}
+
+            term_scores: dict[int, float] = {}
+            for tok in expanded:
+                plist = self.postings[tok]
+                idf = math.log(1 + n_docs / len(plist))
+                for pid, w in plist.items():
+                    if scores is not None and pid not in scores:
+                        continue
+                    s = w * idf
+                    if s > term_scores.get(pid, 0.0):
+                        term_scores[pid] = s
+
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {pid: scores[pid] + s for pid, s in term_scores.items()}
+            if not scores:
+                return {}
+        return scores
+
+    def search(self, query: str, limit: int | None = None) -> list[tuple[int, float]]:
+        """[(product_id, score)] ordenado por relevancia, hasta `limit`."""
+        ranked = rank(self.scores(query))
+        return ranked if limit is None else ranked[:limit]
+
+
+def rank(scores: dict[int, float]) -> list[tuple[int, float]]:
+    return sorted(scores.items(), key=lambda kv: (-kv[1], -kv[0]))
+
+
+class SearchIndex:
+    """Colección acotada (LRU) de índices por tienda."""
+
+    def __init__(self):
+        self._stores: OrderedDict[int, StoreIndex] = OrderedDict()
+        self._lock = threading.Lock()              # solo para el dict
+        self._build_locks: dict[int, threading.Lock] = {}
+
+    def _config(self, key, default):
+        return current_app.config.get(key, default)
+
+    def _build(self, user_id: int, version) -> StoreIndex:
+        from app import db
+        from app.models import Product
+
+        idx = StoreIndex()
+        idx.version = version
+        rows = (db.session.query(Product.id, Product.name, Product.description)
+                .filter(Product.user_id == user_id)
+                .yield_per(1000))
+        for pid, name, description in rows:
+            idx.add(pid, name, description)
+        return idx
+
+    def _fresh(self, user_id: int, version) -> StoreIndex | None:
+        ttl = self._config("SEARCH_INDEX_TTL", 300)
+        with self._lock:
+            idx = self._stores.get(user_id)
+            if idx is None or time.monotonic() - idx.built_at >= ttl:
+                return None
+            if version is not None and idx.version != version:
+                return None
+            self._stores.move_to_end(user_id)
+            return idx
+
+    def _get(self, user_id: int, version=None) -> StoreIndex:
+        idx = self._fresh(user_id, version)
+        if idx is not None:
+            return idx
+        # Un solo hilo construye cada tienda; los demás esperan ese índice
+        with self._lock:
+            build_lock = self._build_locks.setdefault(user_id, threading.Lock())
+        with build_lock:
+            idx = self._fresh(user_id, version)
+            if idx is not None:
+                return idx
+            idx = self._build(user_id, version)
+            with self._lock:
+                self._stores[user_id] = idx
+                self._stores.move_to_end(user_id)
+                max_stores = self._config("SEARCH_INDEX_MAX_STORES", 200)
+                while len(self._stores) > max_stores:
+                    evicted, _ = self._stores.popitem(last=False)
+                    self._build_locks.pop(evicted, None)
+        return idx
+
+    def scores(self, user_id: int, query: str, version=None) -> dict[int, float]:
+        """Todas las coincidencias {product_id: score}; `version` es la catalog_version vigente."""
+        idx = self._get(user_id, version)
+        with idx.lock:
+            return idx.scores(query)
+
+    def search(self, user_id: int, query: str, version=None, limit: int | None = None) -> list[tuple[int, float]]:
+        """Coincidencias ordenadas por relevancia, acotadas a SEARCH_MAX_RESULTS."""
+        limit = self._config("SEARCH_MAX_RESULTS", 1000) if limit is None else limit
+        return rank(self.scores(user_id, query, version))[:limit]
+
+    # ---------- Sincronización desde el dashboard ----------
+    def _existing(self, user_id: int) -> StoreIndex | None:
+        with self._lock:
+            return self._stores.get(user_id)
+
+    # `version` es la catalog_version que dejó el commit del cambio; si otro
+    # worker escribió en medio no coincide y el índice se reconstruye igual.
+    def index_product(self, product, version=None):
+        idx = self._existing(product.user_id)
+        if idx is not None:
+            with idx.lock:
+                idx.add(product.id, product.name, product.description)
+                idx.advance(version)
+
+    def remove_product(self, user_id: int, product_id: int, version=None):
+        idx = self._existing(user_id)
+        if idx is not None:
+            with idx.lock:
+                idx.remove(product_id)
+                idx.advance(version)
+
+    def invalidate_store(self, user_id: int):
+        with self._lock:
+            self._stores.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._stores.clear()
+
+
+search_index = SearchIndex()
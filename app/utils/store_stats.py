@@ -0,0 +1,113 @@
+"""
+Contadores denormalizados de productos por tienda (tabla store_stats).
+
+Cada cambio de producto aplica su diferencia (total, disponibles, no
+disponibles, en descuento) con un UPDATE incremental dentro de la misma
+transacción, así el dashboard lee los números en O(1). `reconcile` los
+recalcula desde `products` si alguna vez se desincronizan.
+"""
+from sqlalchemy import case, delete, func, insert
+
+from app import db
+from app.models import Product, StoreStats, User
+
+_COUNTERS = ("total", "available", "unavailable", "on_discount")
+
+
+def _get(obj, name):
+    return obj.get(name) if isinstance(obj, dict) else getattr(obj, name)
+
+
+def on_discount(obj) -> bool:
+    price = _get(obj, "effective_price")
+    original = _get(obj, "original_price")
+    return original is not None and price is not None and original > price
+
+
+def contribution(obj) -> tuple[int, int, int, int]:
+    """Aporte de un producto (objeto o dict de columnas) a cada contador."""
+    if obj is None:
+        return (0, 0, 0, 0)
+    status = _get(obj, "status") or "available"
+    return (
+        1,
+        int(status == "available"),
+        int(status == "unavailable"),
+        int(on_discount(obj)),
+    )
+
+
+def snapshot(product) -> tuple[int, int, int, int]:
+    """Aporte actual, para tomarlo antes de editar el producto."""
+    return contribution(product)
+
+
+def apply_delta(user_id: int, before=(0, 0, 0, 0), after=(0, 0, 0, 0)):
+    """Suma after - before a los contadores; no hace commit."""
+    delta = [a - b for a, b in zip(after, before)]
+    if not any(delta):
+        return
+    result = db.session.execute(
+        StoreStats.__table__.update()
+        .where(StoreStats.user_id == user_id)
+        .values({getattr(StoreStats, name): getattr(StoreStats, name) + d
+                 for name, d in zip(_COUNTERS, delta) if d})
+    )
+    if result.rowcount == 0:
+        # Tienda sin fila todavía: se calcula completa (ya incluye este cambio)
+        db.session.flush()
+        reconcile([user_id])
+
+
+def touch(user_ids):
+    """
+    Marca las tiendas como modificadas: updated_at (Last-Modified) y
+    catalog_version (ETag del catálogo). No hace commit.
+    """
+    user_ids = [user_ids] if isinstance(user_ids, int) else list(user_ids)
+    if not user_ids:
+        return
+    (User.query
+     .filter(User.id.in_(user_ids))
+     .update({User.updated_at: func.now(), User.catalog_version: User.catalog_version + 1},
+             synchronize_session=False))
+
+
+def get(user_id: int) -> StoreStats:
+    stats = db.session.get(StoreStats, user_id)
+    if stats is None:
+        reconcile([user_id])
+        db.session.commit()
+        stats = db.session.get(StoreStats, user_id)
+    return stats
+
+
+def _aggregate(user_ids=None):
+    q = (db.session.query(
+            User.id,
+            func.count(Product.id),
+            func.coalesce(func.sum(case((Product.status == "available", 1), else_=0)), 0),
+            func.coalesce(func.sum(case((Product.status == "unavailable", 1), else_=0)), 0),
+            func.coalesce(func.sum(case(
+                ((Product.original_price.isnot(None)) & (Product.original_price > Product.effective_price), 1),
+                else_=0)), 0),
+         )
+         .outerjoin(Product, Product.user_id == User.id)
+         .group_by(User.id))
+    if user_ids is not None:
+        q = q.filter(User.id.in_(user_ids))
+    return q
+
+
+def reconcile(user_ids=None, batch_size: int = 1000) -> int:
+    """Recalcula los contadores (de todas las tiendas si user_ids es None); no hace commit."""
+    rows = [dict(user_id=r[0], **dict(zip(_COUNTERS, map(int, r[1:])))) for r in _aggregate(user_ids)]
+    for i in range(0, len(rows), batch_size):
+        chunk = rows[i:i + batch_size]
+        ids = [r["user_id"] for r in chunk]
+        db.session.execute(delete(StoreStats).where(StoreStats.user_id.in_(ids)))
+        db.session.execute(insert(StoreStats), chunk)
+    for obj in list(db.session.identity_map.values()):
+        if isinstance(obj, StoreStats):
+            db.session.expire(obj)
+    return len(rows)
@@ -0,0 +1,53 @@
+"""
+Arranque en frío de Jinja.
+
+- Caché de bytecode en disco (JINJA_BYTECODE_CACHE_DIR, por defecto
+  instance/jinja_cache): un worker nuevo carga las plantillas ya compiladas
+  en vez de volver a parsearlas. Se desactiva con JINJA_BYTECODE_CACHE=False.
+- `precompile` compila todas las plantillas (llena esa caché y falla ante
+  errores de sintaxis); lo usa `flask templates compile` en el deploy.
+- `warm_up` deja compiladas en memoria las plantillas más usadas; wsgi.py lo
+  llama en el maestro de gunicorn (preload_app) y los workers lo heredan.
+"""
+import os
+import time
+
+from jinja2 import FileSystemBytecodeCache
+
+HOT_TEMPLATES = (
+    "base.html",
+    "public/store.html",
+    "dashboard/layout.html",
+    "dashboard/index.html",
+    "auth/login.html",
+    "errors/404.html",
+)
+
+
+def configure(app):
+    """Debe llamarse antes del primer uso de app.jinja_env."""
+    if not app.config.get("JINJA_BYTECODE_CACHE", True):
+        return None
+    folder = app.config.get("JINJA_BYTECODE_CACHE_DIR") or os.path.join(app.instance_path, "jinja_cache")
+    os.makedirs(folder, exist_ok=True)
+    cache = FileSystemBytecodeCache(folder)
+    app.jinja_options = {**app.jinja_options, "bytecode_cache": cache}
+    return cache
+
+
+def precompile(app, names=None) -> tuple[int, float]:
+    """Compila `names` (todas si es None); devuelve (cantidad, segundos)."""
+    env = app.jinja_env
+    names = list(names) if names is not None else [
+        n for n in env.list_templates() if n.endswith((".html", ".txt", ".xml"))
+    ]
+    t0 = time.perf_counter()
+    for name in names:
+        env.get_template(name)
+    return len(names), time.perf_counter() - t0
+
+
+def warm_up(app) -> float:
+    names = app.config.get("TEMPLATE_WARMUP", HOT_TEMPLATES)
+    _count, elapsed = precompile(app, [n for n in names if n in set(app.jinja_env.list_templates())])
+    return elapsed
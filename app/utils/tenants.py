@@ -0,0 +1,169 @@
+"""
+Resolución de tiendas (tenants) por subdominio.
+
+Se mantiene en memoria un mapa subdominio -> Tenant con los datos que
+necesita el catálogo público, recargado cada TENANT_REFRESH_SECONDS. Mientras
+el mapa contenga todas las tiendas (hasta TENANT_MAP_MAX) es autoritativo:
+un subdominio desconocido se rechaza sin consultar la base de datos. Si hay
+más tiendas que el límite, el mapa se comporta como una caché LRU y los
+fallos se consultan uno a uno.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from flask import current_app
+
+
+class Tenant(NamedTuple):
+    id: int
+    subdomain: str
+    store_name: str
+    store_address: str
+    city: str
+    country: str
+    celphone: str
+    status: str
+    updated_at: object
+    catalog_version: int
+
+
+_COLUMNS = Tenant._fields
+
+
+class TenantMap:
+
+    def __init__(self):
+        self._by_sub: OrderedDict[str, Tenant] = OrderedDict()
+        self._complete = False
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.hits = self.misses = self.rejected = self.refreshes = 0
+
+    def _config(self, key, default):
+        return current_app.config.get(key, default)
+
+    # ---------- Carga ----------
+    def refresh(self):
+        from app import db
+        from app.models import User
+
+        max_size = self._config("TENANT_MAP_MAX", 50000)
+        cols = [getattr(User, name) for name in _COLUMNS]
+        rows = (db.session.query(*cols)
+                .order_by(User.id.desc())
+                .limit(max_size + 1)
+                .all())
+        complete = len(rows) <= max_size
+        fresh = OrderedDict((r.subdomain, Tenant(*r)) for r in reversed(rows[:max_size]))
+
+        with self._lock:
+            self._by_sub = fresh
+            self._complete = complete
+            self._loaded_at = time.monotonic()
+            self.refreshes += 1
+
+    def _maybe_refresh(self, min_age: float):
+        if time.monotonic() - self._loaded_at < min_age:
+            return
+        # Una sola recarga a la vez; el resto sigue usando el mapa anterior
+        if not self._refresh_lock.acquire(blocking=self._loaded_at == 0):
+            return
+        try:
+            if time.monotonic() - self._loaded_at >= min_age:
+                self.refresh()
+        finally:
+            self._refresh_lock.release()
+
+    # ---------- Consulta ----------
+    def resolve(self, subdomain: str) -> Tenant | None:
+        if not subdomain:
+            return None
+        self._maybe_refresh(self._config("TENANT_REFRESH_SECONDS", 60))
+
+        with self._lock:
+            tenant = self._by_sub.get(subdomain)
+            if tenant is not None:
+                self._by_sub.move_to_end(subdomain)
+                self.hits += 1
+                return tenant
+            complete = self._complete
+
+        if complete:
+            # Puede ser una tienda recién creada en otro worker: como mucho una
+            # recarga cada TENANT_MISS_REFRESH_SECONDS, nunca una consulta por fallo.
+            self._maybe_refresh(self._config("TENANT_MISS_REFRESH_SECONDS", 10))
+            with self._lock:
+                tenant = self._by_sub.get(subdomain)
+                if tenant is None:
+                    self.rejected += 1
+                return tenant
+
+        self.misses += 1
+        return self._load_one(subdomain)
+
+    def _load_one(self, subdomain: str) -> Tenant | None:
+        from app import db
+        from app.models import User
+
+        cols = [getattr(User, name) for name in _COLUMNS]
+        row = db.session.query(*cols).filter(User.subdomain == subdomain).first()
+        if row is None:
+            return None
+        tenant = Tenant(*row)
+        self._put(tenant)
+        return tenant
+
+    def _put(self, tenant: Tenant):
+        max_size = self._config("TENANT_MAP_MAX", 50000)
+        with self._lock:
+            self._by_sub[tenant.subdomain] = tenant
+            self._by_sub.move_to_end(tenant.subdomain)
+            while len(self._by_sub) > max_size:
+                self._by_sub.popitem(last=False)
+                self._complete = False
+
+    # ---------- Sincronización ----------
+    def update(self, user):
+        """Alta o cambio de una tienda (registro, perfil)."""
+        self._put(Tenant(*(getattr(user, name) for name in _COLUMNS)))
+
+    def reload(self, subdomain: str) -> Tenant | None:
+        """Vuelve a leer una tienda cuya copia en memoria quedó vieja."""
+        return self._load_one(subdomain)
+
+    def remove(self, subdomain: str):
+        with self._lock:
+            self._by_sub.pop(subdomain, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._by_sub),
+                "complete": self._complete,
+                "hits": self.hits,
+                "misses": self.misses,
+                "rejected": self.rejected,
+                "refreshes": self.refreshes,
+                "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+            }
+
+
+tenant_map = TenantMap()
+
+
+def subdomain_from_host(host: str, base_domain: str | None) -> str | None:
+    """'acme.samustore.tld:5000' -> 'acme' si base_domain es 'samustore.tld'."""
+    if not host or not base_domain:
+        return None
+    host = host.split(":", 1)[0].lower().rstrip(".")
+    base_domain = base_domain.lower().lstrip(".")
+    suffix = "." + base_domain
+    if not host.endswith(suffix):
+        return None
+    sub = host[:-len(suffix)]
+    if not sub or "." in sub or sub == "www":
+        return None
+    return sub
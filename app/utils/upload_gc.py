@@ -0,0 +1,228 @@
+"""
+Borrado diferido de imágenes subidas y recolección de huérfanas.
+
+- `schedule_delete` no toca el disco: anota el archivo (y sus variantes) en
+  la sesión de SQLAlchemy. Si la transacción se confirma, un hilo de fondo
+  (FILE_DELETE_WORKERS, 0 = en línea) vuelve a comprobar que ningún producto
+  lo use y lo borra; si hay rollback, la anotación se descarta y el archivo
+  queda intacto.
+- `sweep` recorre uploads/<user_id>/ y, con consultas por lotes de usuarios,
+  borra lo que ningún Product.image_url / image_variants referencia: restos
+  de commits fallidos, URLs reemplazadas, usuarios eliminados, temporales
+  .part. Solo toca archivos sin modificar hace más de UPLOAD_GC_MIN_AGE
+  segundos (una subida cuyo commit aún no llegó no se confunde con basura).
+  Pensado para cron: `flask uploads sweep [--dry-run]`.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+log = logging.getLogger(__name__)
+
+_PENDING_KEY = "pending_file_deletes"
+# <sha256>-<ancho>w.<ext>: variante de <sha256>.<ext> (ver app/utils/images.py)
+_VARIANT = re.compile(r"^([0-9a-f]{64})-\d+w\.\w+$")
+
+
+class FileDeleter:
+
+    def __init__(self):
+        self.app = None
+        self.workers = 1
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.deleted = self.skipped = self.failed = self.discarded = 0
+        self.reclaimed_bytes = 0
+        self.sweeps = self.swept_files = self.swept_bytes = 0
+        self.last_sweep = None
+
+    def init_app(self, app):
+        self.app = app
+        self.workers = app.config.get("FILE_DELETE_WORKERS", 1)
+        if not event.contains(Session, "after_commit", _after_commit):
+            event.listen(Session, "after_commit", _after_commit)
+            event.listen(Session, "after_transaction_end", _after_transaction_end)
+
+    # ---------- Encolado ----------
+    def schedule_delete(self, session, user_id: int, rel_path: str | None, variants=()):
+        """Borra `rel_path` (relativo a static/) tras el commit, si nadie más lo usa."""
+        if not rel_path or rel_path.startswith(("http://", "https://")):
+            return
+        session.info.setdefault(_PENDING_KEY, []).append((user_id, rel_path, tuple(variants), time.time()))
+
+    def _get_executor(self):
+        # Tras un fork (gunicorn) el hilo del padre no existe en el hijo
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="file-delete")
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, items):
+        if not self.workers:
+            self._delete_batch(items)
+            return
+        with self._lock:
+            self.pending += len(items)
+        self._get_executor().submit(self._delete_batch, items)
+
+    # ---------- Borrado (hilo de fondo) ----------
+    def _delete_batch(self, items):
+        from app import db
+        from app.utils.uploads import is_referenced
+
+        try:
+            with self.app.app_context():
+                for user_id, rel_path, variants, scheduled_at in items:
+                    try:
+                        if is_referenced(user_id, rel_path):
+                            self.skipped += 1
+                            continue
+                        for rel in (rel_path, *variants):
+                            self._remove(rel, scheduled_at)
+                    except Exception:
+                        self.failed += 1
+                        log.exception("No se pudo borrar %s", rel_path)
+                db.session.remove()
+        finally:
+            if self.workers:
+                with self._lock:
+                    self.pending -= len(items)
+
+    def _remove(self, rel: str, scheduled_at: float):
+        path = os.path.join(self.app.static_folder, rel)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return
+        # Tocado después de encolar: otra subida lo reutilizó (save_image hace utime)
+        if st.st_mtime > scheduled_at:
+            self.skipped += 1
+            return
+        os.remove(path)
+        self.deleted += 1
+        self.reclaimed_bytes += st.st_size
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "deleted": self.deleted,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "discarded": self.discarded,
+            "reclaimed_bytes": self.reclaimed_bytes,
+            "sweeps": self.sweeps,
+            "swept_files": self.swept_files,
+            "swept_bytes": self.swept_bytes,
+            "last_sweep": self.last_sweep,
+        }
+
+
+deleter = FileDeleter()
+
+
+def _after_commit(session):
+    items = session.info.pop(_PENDING_KEY, None)
+    if items and deleter.app is not None:
+        deleter.submit(items)
+
+
+def _after_transaction_end(session, transaction):
+    # Rollback o close sin commit: after_commit no se llamó y la lista sigue ahí
+    if transaction.parent is None:
+        items = session.info.pop(_PENDING_KEY, None)
+        if items:
+            deleter.discarded += len(items)
+
+
+# ---------- Recolección de huérfanas ----------
+def _user_dirs(base: str) -> list[int]:
+    try:
+        return sorted(int(e.name) for e in os.scandir(base) if e.is_dir() and e.name.isdigit())
+    except FileNotFoundError:
+        return []
+
+
+def _referenced(user_ids, prefix: str) -> tuple[set, dict]:
+    """(ids de usuarios existentes, {user_id: {rutas referenciadas}}) para un lote."""
+    from app import db
+    from app.models import Product, User
+
+    existing = set(db.session.scalars(select(User.id).where(User.id.in_(user_ids))))
+    refs = {uid: set() for uid in user_ids}
+    rows = db.session.execute(
+        select(Product.user_id, Product.image_url, Product.image_variants)
+        .where(Product.user_id.in_(user_ids), Product.image_url.like(f"{prefix}/%"))
+    )
+    for user_id, image_url, variants in rows:
+        refs[user_id].add(image_url)
+        for sizes in (variants or {}).values():
+            refs[user_id].update(sizes.values())
+    return existing, refs
+
+
+def sweep(app, dry_run: bool = False, min_age: float | None = None, batch_size: int = 200) -> dict:
+    """Borra (o con dry_run solo cuenta) los archivos de uploads/ sin referencias."""
+    from app import db
+
+    base = os.path.abspath(app.config.get("UPLOAD_FOLDER", "app/static/uploads"))
+    prefix = os.path.relpath(base, os.path.abspath(app.static_folder)).replace("\\", "/")
+    min_age = app.config.get("UPLOAD_GC_MIN_AGE", 3600) if min_age is None else min_age
+    cutoff = time.time() - min_age
+    result = {"users": 0, "files": 0, "orphans": 0, "reclaimed_bytes": 0, "recent": 0, "errors": 0,
+              "dry_run": dry_run}
+
+    user_ids = _user_dirs(base)
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        existing, refs = _referenced(batch, prefix)
+        db.session.remove()
+        for uid in batch:
+            result["users"] += 1
+            folder = os.path.join(base, str(uid))
+            keep = refs[uid]
+            originals = {os.path.basename(r).split(".", 1)[0] for r in keep}
+            for entry in os.scandir(folder):
+                if not entry.is_file():
+                    continue
+                result["files"] += 1
+                rel = f"{prefix}/{uid}/{entry.name}"
+                if uid in existing:
+                    if rel in keep:
+                        continue
+                    # Variante aún no registrada de un original en uso
+                    m = _VARIANT.match(entry.name)
+                    if m and m.group(1) in originals:
+                        continue
+                try:
+                    st = entry.stat()
+                    if st.st_mtime > cutoff:
+                        result["recent"] += 1
+                        continue
+                    if not dry_run:
+                        os.remove(entry.path)
+                    result["orphans"] += 1
+                    result["reclaimed_bytes"] += st.st_size
+                except OSError:
+                    result["errors"] += 1
+                    log.exception("No se pudo borrar %s", entry.path)
+            if uid not in existing and not dry_run:
+                try:
+                    os.rmdir(folder)   # solo si quedó vacía
+                except OSError:
+                    pass
+
+    if not dry_run:
+        deleter.sweeps += 1
+        deleter.swept_files += result["orphans"]
+        deleter.swept_bytes += result["reclaimed_bytes"]
+        deleter.last_sweep = time.time()
+    return result
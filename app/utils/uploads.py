@@ -0,0 +1,129 @@
+"""
+Subida de imágenes direccionada por contenido.
+
+El archivo se copia en bloques a un temporal mientras se calcula su SHA-256,
+se corta en cuanto supera MAX_IMAGE_BYTES y el tipo real se detecta por los
+bytes mágicos (no por la extensión); con Pillow instalado, además, el
+archivo completo debe decodificar como ese formato (Image.verify) antes de
+guardarse. El nombre final es el hash, así que
+subir la misma foto para varios productos reutiliza un único archivo; el
+conteo de referencias son los productos del dueño que apuntan a esa ruta.
+"""
+import hashlib
+import os
+import tempfile
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - dependencia opcional
+    Image = None
+
+from flask import current_app
+
+CHUNK_SIZE = 64 * 1024
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024  # coincide con el texto del formulario
+
+# (firma, extensión); WebP se valida aparte (RIFF....WEBP)
+_MAGIC = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+_SNIFF_BYTES = 12
+_PIL_FORMATS = {"jpg": "JPEG", "png": "PNG", "gif": "GIF", "webp": "WEBP"}
+
+
+class UploadError(ValueError):
+    pass
+
+
+def sniff_image_type(head: bytes) -> str | None:
+    for magic, ext in _MAGIC:
+        if head.startswith(magic):
+            return ext
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def _verify_image(path: str, ext: str):
+    """La cabecera puede ser válida y el resto basura: Pillow recorre el archivo entero."""
+    if Image is None:
+        return
+    try:
+        with Image.open(path) as im:
+            im.verify()
+            if im.format != _PIL_FORMATS[ext]:
+                raise UploadError("Formato de imagen no permitido.")
+    except UploadError:
+        raise
+    except Exception:
+        raise UploadError("Formato de imagen no permitido.")
+
+
+def _allowed(ext: str) -> bool:
+    allowed = current_app.config.get("ALLOWED_IMAGE_EXTENSIONS", set())
+    return ext in allowed or (ext == "jpg" and "jpeg" in allowed)
+
+
+def save_image(file_storage, user_id: int) -> str:
+    """Guarda la imagen y devuelve su ruta relativa a static/ (ej: "uploads/42/<sha256>.jpg")."""
+    base_folder = current_app.config.get("UPLOAD_FOLDER", "app/static/uploads")
+    max_bytes = current_app.config.get("MAX_IMAGE_BYTES", DEFAULT_MAX_BYTES)
+    user_folder = os.path.join(base_folder, str(user_id))
+    os.makedirs(user_folder, exist_ok=True)
+
+    hasher = hashlib.sha256()
+    size = 0
+    head = b""
+    ext = None
+    fd, tmp_path = tempfile.mkstemp(dir=user_folder, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            stream = file_storage.stream
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadError(f"La imagen supera el tamaño máximo ({max_bytes // (1024 * 1024)} MB).")
+                # El tipo se decide con los primeros bytes, antes de seguir copiando
+                if ext is None:
+                    head += chunk[:_SNIFF_BYTES]
+                    if len(head) >= _SNIFF_BYTES:
+                        ext = sniff_image_type(head)
+                        if ext is None or not _allowed(ext):
+                            raise UploadError("Formato de imagen no permitido.")
+                hasher.update(chunk)
+                tmp.write(chunk)
+
+        if ext is None:
+            raise UploadError("Formato de imagen no permitido.")
+        _verify_image(tmp_path, ext)
+
+        abs_path = os.path.join(user_folder, f"{hasher.hexdigest()}.{ext}")
+        if os.path.exists(abs_path):
+            os.remove(tmp_path)      # misma foto ya subida: se comparte
+            os.utime(abs_path)       # y el borrado diferido / sweep la ven como recién usada
+        else:
+            os.replace(tmp_path, abs_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    rel_from_static = os.path.relpath(abs_path, start="app/static")
+    return rel_from_static.replace("\\", "/")
+
+
+def is_referenced(user_id: int, rel_path: str, exclude_product_id: int | None = None) -> bool:
+    """¿Algún otro producto del dueño sigue usando este archivo?"""
+    from app import db
+    from app.models import Product
+
+    q = Product.query.filter(Product.user_id == user_id, Product.image_url == rel_path)
+    if exclude_product_id is not None:
+        q = q.filter(Product.id != exclude_product_id)
+    return db.session.query(q.exists()).scalar()
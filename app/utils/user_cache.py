@@ -0,0 +1,76 @@
+"""
+Caché del user_loader de Flask-Login.
+
+En vez de consultar `usuarios` en cada petición autenticada, se guarda por
+proceso una copia plana (SessionUser) del usuario, sin la contraseña y sin
+adjuntar ninguna instancia ORM a la sesión de SQLAlchemy. Las vistas que
+modifican al usuario cargan la fila real con `db.session.get(User, id)`.
+"""
+from flask_login import UserMixin
+
+from app.utils.cache import TTLCache
+
+# Columnas que se copian del modelo (la contraseña nunca)
+_FIELDS = (
+    "id", "username", "userlastname", "email", "store_name", "store_address",
+    "celphone", "subdomain", "country", "city", "status", "created_at", "updated_at",
+)
+
+
+class SessionUser(UserMixin):
+    """Representación liviana y de solo lectura del usuario autenticado."""
+
+    __slots__ = _FIELDS
+
+    def __init__(self, **values):
+        for name in _FIELDS:
+            object.__setattr__(self, name, values.get(name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SessionUser es de solo lectura; usa db.session.get(User, id).")
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(**{name: getattr(row, name) for name in _FIELDS})
+
+    def get_id(self):
+        return str(self.id)
+
+    def __repr__(self):
+        return f'<SessionUser {self.email}>'
+
+
+user_cache = TTLCache(maxsize=1024, ttl=60)
+
+
+def load_user(user_id: str):
+    from app import db
+    from app.models import User
+
+    try:
+        uid = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    cached = user_cache.get(uid)
+    if cached is not None:
+        return cached
+
+    cols = [getattr(User, name) for name in _FIELDS]
+    row = db.session.query(*cols).filter(User.id == uid).first()
+    if row is None:
+        return None
+    user = SessionUser.from_row(row)
+    user_cache.set(uid, user)
+    return user
+
+
+def invalidate_user(user_id: int):
+    user_cache.delete(int(user_id))
+
+
+def init_app(app):
+    user_cache.configure(
+        maxsize=app.config.get("USER_CACHE_SIZE", 1024),
+        ttl=app.config.get("USER_CACHE_TTL", 60),
+    )
@@ -1,6 +1,7 @@
 import re, unicodedata
 from app.models import User
 from app import db
+from app.utils.cache import TTLCache
 
 def slugify(value: str) -> str:
     value = unicodedata.normalize('NFKD', value).encode('ascii', 'ignore').decode('ascii')
@@ -17,13 +18,49 @@ def email_exists(email: str) -> bool:
 def subdomain_exists(subdomain: str) -> bool:
     return db.session.query(User.query.filter_by(subdomain=subdomain).exists()).scalar()
 
-def suggest_subdomains(base: str, k: int = 3):
+def _taken_suffixes(base: str) -> tuple[bool, set[int]]:
+    """(¿"base" está tomado?, sufijos numéricos ya usados de "<base>-N"), en
+    una sola consulta por rango.
+
+    El rango [base, base.) cubre exactamente "base" y los subdominios que
+    empiezan con "base-" (en un slug solo '-' cae antes que '.' en ASCII) y lo
+    resuelve el índice único.
+    """
+    rows = (db.session.query(User.subdomain)
+            .filter(User.subdomain >= base, User.subdomain < f"{base}.")
+            .all())
+    prefix_len = len(base) + 1
+    exact = any(s == base for (s,) in rows)
+    return exact, {int(s[prefix_len:]) for (s,) in rows if s[prefix_len:].isdigit()}
+
+def suggest_subdomains(base: str, k: int = 3, taken: set[int] | None = None):
+    """Devuelve k sugerencias disponibles ("base-2", "base-3", ...) a partir del slug base."""
     base = slugify(base)
-    i = 2
+    if taken is None:
+        _, taken = _taken_suffixes(base)
     out = []
+    i = 2
     while len(out) < k:
-        cand = f"{base}-{i}"
-        if not subdomain_exists(cand):
-            out.append(cand)
+        if i not in taken:
+            out.append(f"{base}-{i}")
         i += 1
     return out
+
+
+# Respuestas del chequeo en vivo del formulario de registro
+availability_cache = TTLCache(maxsize=2048, ttl=10)
+
+def subdomain_availability(raw: str, k: int = 3) -> dict:
+    subdomain = slugify(raw or "")
+    cached = availability_cache.get(subdomain)
+    if cached is not None:
+        return cached
+    # Una consulta para las dos respuestas: el propio slug y sus "-N"
+    exact, taken = _taken_suffixes(subdomain)
+    result = {
+        "subdomain": subdomain,
+        "available": not exact,
+        "suggestions": suggest_subdomains(subdomain, k=k, taken=taken) if exact else [],
+    }
+    availability_cache.set(subdomain, result)
+    return result
@@ -0,0 +1,38 @@
+"""
+Configuración de gunicorn (gunicorn -c gunicorn.conf.py wsgi:app).
+
+La app se carga una vez en el proceso maestro (preload_app) y los workers la
+heredan por fork; cada worker descarta en post_fork los pools de conexiones
+heredados (primaria y réplicas) para abrir los suyos propios.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Reciclar workers de a poco evita que crezcan indefinidamente
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = 200
+
+preload_app = True
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+
+def post_fork(server, worker):
+    # Las conexiones abiertas por el maestro no se comparten entre procesos:
+    # close=False las abandona sin cerrarlas (siguen siendo del maestro).
+    from wsgi import app
+    from app import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
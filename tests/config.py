@@ -0,0 +1,28 @@
+"""
+Configuración para pytest (config.py de la raíz no se versiona).
+
+conftest.py pone esta carpeta primera en sys.path, así que `from config
+import Config` dentro de create_app toma estas clases.
+"""
+
+
+class Config:
+    TESTING = True
+    SECRET_KEY = "test"
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    WTF_CSRF_ENABLED = False
+    ALLOWED_IMAGE_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp"}
+
+    # Nada de hilos ni pools de procesos en las pruebas
+    HASH_WORKERS = 0
+    PASSWORD_HASH_METHOD = "pbkdf2:sha256:1000"
+    FILE_DELETE_WORKERS = 0
+    IMAGE_VARIANTS_ENABLED = False
+    AUDIT_LOG_ENABLED = False
+    RATELIMIT_ENABLED = False
+    JINJA_BYTECODE_CACHE = False
+    CATALOG_CACHE_TTL = 0
+
+
+class ProdConfig(Config):
+    pass
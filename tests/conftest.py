@@ -0,0 +1,55 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(1, os.path.dirname(os.path.dirname(__file__)))
+
+from app import create_app, db  # noqa: E402
+from config import Config  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def make_app(tmp_path_factory):
+    """Fábrica de apps sobre un SQLite en disco nuevo; `overrides` pisa la config."""
+    apps = []
+
+    def factory(**overrides):
+        folder = tmp_path_factory.mktemp("app")
+        settings = {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{folder / 'app.db'}",
+                    "IMAGE_PROXY_CACHE_DIR": str(folder / "image_proxy"), **overrides}
+        application = create_app(type("TestConfig", (Config,), settings))
+        with application.app_context():
+            db.create_all(bind_key=None)   # solo la primaria; las réplicas son copias
+        apps.append(application)
+        return application
+
+    yield factory
+    for application in apps:
+        with application.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def owner(client):
+    """Cliente con sesión iniciada como dueño de la tienda "acme"."""
+    client.post("/auth/register", data=dict(
+        username="Ana", userlastname="Paz", email="ana@example.com", password="secret1",
+        confirm_password="secret1", store_name="Acme", store_address="Calle 1", celphone="123",
+        subdomain="acme", country="BO", city="La Paz"))
+    resp = client.post("/auth/login", data=dict(email="ana@example.com", password="secret1"))
+    assert resp.status_code == 302
+    return client
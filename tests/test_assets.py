@@ -0,0 +1,13 @@
+from app.utils import assets
+
+
+def test_build_warns_without_brotli(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(assets, "brotli", None)
+    app.static_folder = str(tmp_path)
+    (tmp_path / "site.css").write_text("body { color: red; }" * 50)
+
+    result = app.test_cli_runner().invoke(args=["assets", "build"])
+    assert result.exit_code == 0
+    assert "1 archivos, 1 variantes comprimidas" in result.stdout
+    assert "falta el paquete brotli" in result.stderr
+    assert not list((tmp_path / assets.DIST).rglob("*.br"))
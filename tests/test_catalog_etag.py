@@ -0,0 +1,29 @@
+def test_same_second_edit_changes_etag(owner):
+    owner.post("/dashboard/products/new", data=dict(name="Zapato", price="10", status="available"))
+    first = owner.get("/public/acme")
+    assert first.status_code == 200
+
+    # Misma segunda que el alta: los timestamps no cambian, la versión sí
+    owner.post("/dashboard/products/1/edit", data=dict(name="Bota", price="10", status="available"))
+    again = owner.get("/public/acme", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 200
+    assert again.headers["ETag"] != first.headers["ETag"]
+    assert b"Bota" in again.data
+
+
+def test_unchanged_store_returns_304(owner):
+    owner.post("/dashboard/products/new", data=dict(name="Zapato", price="10", status="available"))
+    first = owner.get("/public/acme")
+    again = owner.get("/public/acme", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_same_second_edit_ignores_if_modified_since(owner):
+    owner.post("/dashboard/products/new", data=dict(name="Zapato", price="10", status="available"))
+    first = owner.get("/public/acme")
+
+    # Sin If-None-Match la fecha sola no alcanza: el cambio cae en el mismo segundo
+    owner.post("/dashboard/products/1/edit", data=dict(name="Bota", price="10", status="available"))
+    again = owner.get("/public/acme", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert again.status_code == 200
+    assert b"Bota" in again.data
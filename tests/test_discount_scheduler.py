@@ -0,0 +1,75 @@
+import fcntl
+from datetime import date, timedelta
+
+import pytest
+
+from app import db
+from app.models import Product
+from app.utils.pricing import apply_discounts, discount_scheduler
+
+
+@pytest.fixture
+def scheduler(make_app, tmp_path, monkeypatch):
+    for name in ("_thread", "_pid", "runs", "skipped"):
+        monkeypatch.setattr(discount_scheduler, name, getattr(discount_scheduler, name))
+    app = make_app(DISCOUNT_SCHEDULER_ENABLED=True, DISCOUNT_SCHEDULER_LOCK=str(tmp_path / "lock"))
+    yield app
+    discount_scheduler.stop()
+    if discount_scheduler._thread is not None:
+        discount_scheduler._thread.join(5)
+
+
+def test_thread_starts_with_first_request(scheduler):
+    # create_app (el maestro de gunicorn con preload_app) no arranca hilos
+    assert not discount_scheduler.stats()["running"]
+    scheduler.test_client().get("/")
+    assert discount_scheduler.stats()["running"]
+
+
+def test_only_one_process_per_pass(scheduler, tmp_path):
+    runs, skipped = discount_scheduler.runs, discount_scheduler.skipped
+    with open(tmp_path / "lock", "a") as other_worker:
+        fcntl.flock(other_worker, fcntl.LOCK_EX)
+        discount_scheduler.run_once()
+    assert (discount_scheduler.runs, discount_scheduler.skipped) == (runs, skipped + 1)
+
+    discount_scheduler.run_once()
+    assert discount_scheduler.runs == runs + 1
+
+
+def test_pass_already_applied_today_is_skipped(scheduler, tmp_path):
+    # Un worker que arranca a media jornada no repite la pasada del día
+    marker = tmp_path / "lock"
+    marker.write_text(date.today().isoformat())
+    runs, skipped = discount_scheduler.runs, discount_scheduler.skipped
+    discount_scheduler.run_once()
+    assert (discount_scheduler.runs, discount_scheduler.skipped) == (runs, skipped + 1)
+
+    marker.write_text((date.today() - timedelta(days=1)).isoformat())
+    discount_scheduler.run_once()
+    assert discount_scheduler.runs == runs + 1
+    assert marker.read_text() == date.today().isoformat()
+
+
+def test_pass_reads_only_windows_that_changed(owner, app):
+    today = date.today()
+    windows = {
+        "abre hoy": (today, None),
+        "cerró ayer": (None, today - timedelta(days=1)),
+        "abierta hace días": (today - timedelta(days=5), None),
+    }
+    with app.app_context():
+        for name, (start, end) in windows.items():
+            # effective_price viejo en los tres: el del día anterior a cada cambio
+            stale = 100 if start is not None else 80
+            db.session.add(Product(user_id=1, name=name, price=80, original_price=100,
+                                   discount_start=start, discount_end=end, effective_price=stale))
+        db.session.commit()
+
+        assert apply_discounts(today) == (2, {1})
+        prices = {p.name: p.effective_price for p in Product.query}
+        assert (prices["abre hoy"], prices["cerró ayer"], prices["abierta hace días"]) == (80, 100, 100)
+
+        # La que abrió hace días solo la ve una pasada desde antes de ese día, o --full
+        assert apply_discounts(today, since=today - timedelta(days=6)) == (1, {1})
+        assert apply_discounts(today, full=True) == (0, set())
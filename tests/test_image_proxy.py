@@ -0,0 +1,156 @@
+import io
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from app.utils import image_proxy as proxy_module
+from app.utils.image_proxy import DiskLRU, image_proxy
+
+
+def _png(width: int, height: int) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), "green").save(buf, "PNG")
+    return buf.getvalue()
+
+
+class _Origin(BaseHTTPRequestHandler):
+    hits = Counter()
+    routes = {
+        "/photo.png": _png(640, 320),
+        "/huge.png": b"\x89PNG\r\n\x1a\n" + b"\0" * 4096,
+    }
+
+    def do_GET(self):
+        self.hits[self.path] += 1
+        if self.path.startswith("/redirect"):
+            # 127.0.0.2 también es loopback: una IP privada distinta del origen
+            self.send_response(302)
+            self.send_header("Location", f"http://127.0.0.2:{self.server.server_port}/photo.png")
+            self.end_headers()
+            return
+        if self.path.startswith("/slow"):
+            # Un byte cada 50ms: ninguna lectura pasa IMAGE_PROXY_TIMEOUT
+            self.send_response(200)
+            self.send_header("Content-Length", "1000")
+            self.end_headers()
+            try:
+                for _ in range(1000):
+                    self.wfile.write(b"\0")
+                    self.wfile.flush()
+                    time.sleep(0.05)
+            except OSError:
+                pass
+            return
+        body = self.routes.get(self.path.split("?", 1)[0])
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def origin():
+    server = ThreadingHTTPServer(("0.0.0.0", 0), _Origin)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(IMAGE_PROXY_ALLOW_PRIVATE=True, IMAGE_PROXY_MAX_BYTES=2048, IMAGE_PROXY_ERROR_TTL=0.3,
+                    IMAGE_PROXY_TIMEOUT=1, IMAGE_PROXY_TOTAL_TIMEOUT=0.5)
+
+
+def _proxied(app, url: str, width: int | None = None) -> str:
+    with app.test_request_context():
+        return image_proxy.url_for(url, width)
+
+
+def test_fetch_resize_and_cache(app, client, origin):
+    url = _proxied(app, f"{origin}/photo.png", 320)
+    resp = client.get(url, headers={"Accept": "image/webp"})
+    assert resp.status_code == 200
+    assert resp.mimetype == "image/webp"
+    with Image.open(io.BytesIO(resp.data)) as im:
+        assert (im.format, im.size) == ("WEBP", (320, 160))
+
+    hits = _Origin.hits["/photo.png"]
+    assert client.get(url, headers={"Accept": "image/webp"}).status_code == 200
+    assert _Origin.hits["/photo.png"] == hits          # servida desde el disco
+
+
+def test_origin_fetched_once_for_all_variants(app, client, origin):
+    src = f"{origin}/photo.png?all-variants"
+    for width in (320, 640, 1024):
+        for accept in ("image/webp", "image/jpeg"):
+            resp = client.get(_proxied(app, src, width), headers={"Accept": accept})
+            assert resp.status_code == 200
+    assert _Origin.hits["/photo.png?all-variants"] == 1
+
+
+def test_bad_signature_is_404(app, client, origin):
+    url = _proxied(app, f"{origin}/photo.png").replace("s=", "s=0")
+    assert client.get(url).status_code == 404
+
+
+def test_byte_limit_is_413(app, client, origin):
+    assert client.get(_proxied(app, f"{origin}/huge.png")).status_code == 413
+
+
+def test_trickling_origin_hits_total_deadline(app, client, origin):
+    t0 = time.monotonic()
+    assert client.get(_proxied(app, f"{origin}/slow.png")).status_code == 504
+    assert time.monotonic() - t0 < 2
+
+
+def test_redirect_to_private_ip_is_403(app, client, origin, monkeypatch):
+    # Solo el origen de la prueba pasa el filtro; el destino de la redirección no
+    real_check = proxy_module._check_address
+    monkeypatch.setattr(proxy_module, "_allow_private", False)
+    monkeypatch.setattr(proxy_module, "_check_address",
+                        lambda ip: None if ip == "127.0.0.1" else real_check(ip))
+    assert client.get(_proxied(app, f"{origin}/redirect")).status_code == 403
+
+
+def test_failure_is_cached_for_error_ttl(app, client, origin):
+    url = _proxied(app, f"{origin}/missing.png")
+    assert client.get(url).status_code == 502
+    assert client.get(url).status_code == 502
+    assert _Origin.hits["/missing.png"] == 1
+
+    time.sleep(0.35)
+    assert client.get(url).status_code == 502
+    assert _Origin.hits["/missing.png"] == 2
+
+
+def test_disk_bound_is_shared_between_workers(tmp_path):
+    # Dos workers con su propio DiskLRU sobre el mismo directorio
+    first, second = DiskLRU(), DiskLRU()
+    first.configure(str(tmp_path), 1000)
+    second.configure(str(tmp_path), 1000)
+    first.put("a", b"x" * 600)
+    second.put("b", b"y" * 600)
+    assert [p.name for p in tmp_path.iterdir()] == ["b"]
+    assert second.stats()["bytes"] == 600
+
+
+def test_dashboard_thumbnail_goes_through_proxy(owner):
+    owner.post("/dashboard/products/new", data=dict(
+        name="Zapato", price="10", status="available", image_url="https://cdn.example.com/z.jpg"))
+    page = owner.get("/dashboard/").get_data(as_text=True)
+    assert "/_img?u=https" in page
+    assert 'src="https://cdn.example.com/z.jpg"' not in page
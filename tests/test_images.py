@@ -0,0 +1,23 @@
+from PIL import Image
+
+from app.utils import images
+
+
+def test_variants_in_worker_pool(make_app, tmp_path, monkeypatch):
+    monkeypatch.setattr(images, "_executor", None)
+    app = make_app(IMAGE_WORKERS=1)
+    src = tmp_path / "foto.png"
+    Image.new("RGB", (40, 20), "red").save(src)
+
+    executor = images._get_executor(app)
+    assert executor._mp_context.get_start_method() != "fork"
+    out = executor.submit(images.build_variants, str(src), (16,), 80).result(timeout=30)
+    assert out == {"webp": {16: "foto-16w.webp"}, "jpg": {16: "foto-16w.jpg"}}
+    assert (tmp_path / "foto-16w.jpg").exists()
+    executor.shutdown()
+
+    # Pool creado en otro proceso (el master de gunicorn antes del fork): no se reutiliza
+    monkeypatch.setattr(images, "_executor_pid", -1)
+    replacement = images._get_executor(app)
+    assert replacement is not executor
+    replacement.shutdown()
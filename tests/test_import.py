@@ -0,0 +1,112 @@
+import io
+from contextlib import contextmanager
+
+import pytest
+from flask import template_rendered
+
+from app import db
+from app.models import Product, StoreStats
+
+
+@contextmanager
+def _report(app):
+    """Captura el `report` que product_import pasa a la plantilla."""
+    seen = {}
+
+    def record(sender, template, context, **extra):
+        seen.update(context.get("report") or {})
+
+    template_rendered.connect(record, app)
+    try:
+        yield seen
+    finally:
+        template_rendered.disconnect(record, app)
+
+
+def _upload(client, filename, content: bytes, **kwargs):
+    return client.post("/dashboard/products/import", content_type="multipart/form-data",
+                       data=dict(file=(io.BytesIO(content), filename)), **kwargs)
+
+
+def _products(app):
+    with app.app_context():
+        return {p.name: p for p in Product.query.order_by(Product.id)}
+
+
+CSV = (
+    "name,price,original_price,discount_start,discount_end,image_url,status\n"
+    "Zapato,10,,,,,available\n"
+    ",10,,,,,available\n"                                   # sin nombre
+    "Bota,diez,,,,,available\n"                             # precio inválido
+    "Sandalia,8,12,2026-02-10,2026-02-01,,available\n"      # fin antes del inicio
+    "Gorra,5,,,,uploads/2/otra.png,available\n"             # ruta local
+    "Media,3,,,,https://cdn.example.com/m.png,unavailable\n"
+).encode()
+
+
+def test_csv_reports_each_bad_row(owner, app):
+    with _report(app) as report:
+        assert _upload(owner, "productos.csv", CSV).status_code == 200
+    assert (report["inserted"], report["error_count"]) == (2, 4)
+    assert [line for line, _ in report["errors"]] == [3, 4, 5, 6]
+
+    products = _products(app)
+    assert list(products) == ["Zapato", "Media"]
+    assert products["Media"].status == "unavailable"
+    with app.app_context():
+        stats = db.session.get(StoreStats, 1)
+        assert (stats.total, stats.available) == (2, 1)
+
+
+def test_jsonl_accepts_numbers_and_reports_bad_lines(owner, app):
+    content = b"\n".join([
+        b'{"name": "Zapato", "price": 10}',
+        b'{"name": "Bota", "price": [10]}',
+        b"no es json",
+        b'["name", "price"]',
+        b"",
+        b'{"name": "Media", "price": "3.50"}',
+    ])
+    with _report(app) as report:
+        _upload(owner, "productos.jsonl", content)
+    assert (report["inserted"], report["error_count"]) == (2, 3)
+    assert [line for line, _ in report["errors"]] == [2, 3, 4]
+    assert list(_products(app)) == ["Zapato", "Media"]
+
+
+@pytest.fixture
+def small_app(make_app):
+    return make_app(IMPORT_MAX_ROWS=3, IMPORT_BATCH_SIZE=2)
+
+
+def _login(app):
+    client = app.test_client()
+    client.post("/auth/register", data=dict(
+        username="Ana", userlastname="Paz", email="ana@example.com", password="secret1",
+        confirm_password="secret1", store_name="Acme", store_address="Calle 1", celphone="123",
+        subdomain="acme", country="BO", city="La Paz"))
+    client.post("/auth/login", data=dict(email="ana@example.com", password="secret1"))
+    return client
+
+
+def test_max_rows_counts_bad_rows_too(small_app):
+    client = _login(small_app)
+    content = b"name,price\nA,1\n,1\nB,2\nC,3\nD,4\n"
+    with _report(small_app) as report:
+        _upload(client, "productos.csv", content)
+    assert (report["inserted"], report["error_count"]) == (2, 1)
+    assert "máximo de 3 filas" in report["errors"][-1][1]
+    assert list(_products(small_app)) == ["A", "B"]
+
+
+def test_failure_after_a_batch_saves_nothing(make_app):
+    # Los primeros lotes ya se insertaron cuando aparece el byte inválido:
+    # todo va en una sola transacción, así que no queda ninguno
+    app = make_app(IMPORT_BATCH_SIZE=2)
+    client = _login(app)
+    rows = b"".join(b"Producto %d,%d\n" % (i, i + 1) for i in range(2000))
+    resp = _upload(client, "productos.csv", b"name,price\n" + rows + b"Roto \xff,1\n")
+    assert resp.status_code == 302
+    assert _products(app) == {}
+    with app.app_context():
+        assert db.session.get(StoreStats, 1).total == 0
@@ -0,0 +1,21 @@
+def test_metrics_closed_without_token(make_app):
+    client = make_app().test_client()
+    assert client.get("/_metrics").status_code == 404
+
+
+def test_metrics_local_only_when_allowed(make_app):
+    client = make_app(METRICS_ALLOW_LOCAL=True).test_client()
+    assert client.get("/_metrics").status_code == 200
+    assert client.get("/_metrics", environ_base={"REMOTE_ADDR": "10.0.0.5"}).status_code == 404
+
+
+def test_metrics_token(make_app):
+    client = make_app(METRICS_TOKEN="s3cret").test_client()
+    assert client.get("/_metrics").status_code == 404
+    assert client.get("/_metrics", headers={"X-Metrics-Token": "s3cret"}).status_code == 200
+
+
+def test_proxy_fix_trusts_forwarded_for(make_app):
+    client = make_app(METRICS_ALLOW_LOCAL=True, PROXY_FIX_X_FOR=1).test_client()
+    assert client.get("/_metrics", headers={"X-Forwarded-For": "203.0.113.9"}).status_code == 404
+    assert client.get("/_metrics", headers={"X-Forwarded-For": "127.0.0.1"}).status_code == 200
@@ -0,0 +1,93 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert
+
+from app import db
+from app.models import Product
+from app.utils import store_stats
+from app.utils.pagination import encode_cursor
+
+# Mismo segundo para todas: el orden lo desempatan created_at y luego el id
+CREATED = datetime(2026, 1, 1, 12, 0, 0)
+PRICES = [5, 3, 5, 8, 3, 5, 8]
+
+
+@pytest.fixture
+def store(owner, app):
+    with app.app_context():
+        db.session.execute(insert(Product), [
+            dict(user_id=1, name=f"P{i}", price=price, effective_price=price,
+                 status="available", created_at=CREATED, updated_at=CREATED)
+            for i, price in enumerate(PRICES)
+        ])
+        store_stats.touch({1})
+        db.session.commit()
+        ids = {p.name: p.id for p in Product.query}
+    return owner, ids
+
+
+def _page(client, **params):
+    resp = client.get("/public/acme/products.json",
+                      query_string=dict(fields="id,price", per_page=2, **params))
+    assert resp.status_code == 200
+    body = resp.get_json()
+    return [item["id"] for item in body["items"]], body["meta"]
+
+
+def _walk(client, sort):
+    pages, meta = [], {"next": {}}
+    while meta["next"] is not None:
+        ids, meta = _page(client, sort=sort, **meta["next"])
+        pages.append((ids, meta))
+    return pages
+
+
+def test_same_second_ties_follow_id(store):
+    client, ids = store
+    expected = [ids[f"P{i}"] for i in sorted(range(len(PRICES)), key=lambda i: (PRICES[i], i))]
+    pages = _walk(client, "price_asc")
+    assert [i for ids_, _ in pages for i in ids_] == expected
+    assert [len(ids_) for ids_, _ in pages] == [2, 2, 2, 1]
+
+
+@pytest.mark.parametrize("sort", ["new", "price_asc", "price_desc"])
+def test_before_and_after_round_trip(store, sort):
+    client, _ = store
+    pages = _walk(client, sort)
+    assert pages[0][1]["prev"] is None
+    for n in range(1, len(pages)):
+        # "before" desde la página n devuelve la n-1, y su "after" vuelve a la n
+        ids, back = _page(client, sort=sort, **pages[n][1]["prev"])
+        assert ids == pages[n - 1][0]
+        assert _page(client, sort=sort, **back["next"])[0] == pages[n][0]
+
+
+def _raw_cursor(values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("cursor", [
+    "no-es-base64!",
+    _raw_cursor("texto"),                                            # no es una lista
+    _raw_cursor([{"dec": "3"}, {"dt": CREATED.isoformat()}]),        # falta el id
+    _raw_cursor(["3", {"dt": CREATED.isoformat()}, 1]),              # precio sin tipo
+    _raw_cursor([{"dec": "NaN"}, {"dt": CREATED.isoformat()}, 1]),
+    _raw_cursor([{"dec": "3"}, {"dt": "ayer"}, 1]),
+    _raw_cursor([{"dec": "3"}, {"dt": CREATED.isoformat()}, True]),
+])
+def test_malformed_cursor_is_rejected(store, cursor):
+    client, _ = store
+    resp = client.get("/public/acme/products.json", query_string=dict(sort="price_asc", after=cursor))
+    assert resp.status_code == 400
+    assert client.get("/public/acme", query_string=dict(sort="price_asc", before=cursor)).status_code == 400
+
+
+def test_valid_cursor_from_another_sort_is_rejected(store):
+    # Un cursor de "new" (fecha, id) no encaja con las tres columnas de price_asc
+    client, _ = store
+    cursor = encode_cursor([CREATED, 1])
+    resp = client.get("/public/acme/products.json", query_string=dict(sort="price_asc", after=cursor))
+    assert resp.status_code == 400
@@ -0,0 +1,21 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils.passwords import hasher
+
+
+def test_hash_in_worker_pool(make_app, monkeypatch):
+    monkeypatch.setattr(hasher, "_executor", None)
+    make_app(HASH_WORKERS=1)
+    assert hasher.mp_context != "fork"
+    before = hasher.stats()
+
+    with ThreadPoolExecutor(4) as pool:
+        hashes = list(pool.map(hasher.hash, ["a", "b", "c", "d"]))
+        checks = list(pool.map(hasher.verify, hashes, ["a", "b", "c", "x"]))
+    assert checks == [True, True, True, False]
+
+    stats = hasher.stats()
+    assert stats["hashes"] - before["hashes"] == 4
+    assert stats["verifies"] - before["verifies"] == 4
+    assert stats["pending"] == 0
+    hasher._executor.shutdown()
@@ -0,0 +1,20 @@
+from app import db
+from app.models import Product
+
+
+def test_replacing_upload_with_url_deletes_file(owner, app, tmp_path):
+    app.static_folder = str(tmp_path)
+    local = tmp_path / "uploads" / "1" / "foto.png"
+    local.parent.mkdir(parents=True)
+    local.write_bytes(b"x")
+
+    owner.post("/dashboard/products/new", data=dict(name="Zapato", price="10", status="available"))
+    with app.app_context():
+        db.session.get(Product, 1).image_url = "uploads/1/foto.png"
+        db.session.commit()
+
+    owner.post("/dashboard/products/1/edit", data=dict(
+        name="Zapato", price="10", status="available", image_url="https://cdn.example.com/z.jpg"))
+    with app.app_context():
+        assert db.session.get(Product, 1).image_url == "https://cdn.example.com/z.jpg"
+    assert not local.exists()
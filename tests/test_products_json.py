@@ -0,0 +1,45 @@
+import pytest
+
+from app.routes.public import API_DEFAULT_FIELDS, API_FIELDS
+
+
+def _add(client, name, price):
+    client.post("/dashboard/products/new", data=dict(name=name, price=price, status="available"))
+
+
+def _get(client, headers=None, **params):
+    return client.get("/public/acme/products.json", query_string=params, headers=headers)
+
+
+def test_default_fields(owner):
+    _add(owner, "Zapato", "10")
+    items = _get(owner).get_json()["items"]
+    assert [list(item) for item in items] == [list(API_DEFAULT_FIELDS)]
+
+
+def test_only_requested_fields_in_requested_order(owner):
+    _add(owner, "Zapato", "10")
+    _add(owner, "Bota", "20")
+    # El orden por precio necesita created_at e id para el cursor, pero no se devuelven
+    body = _get(owner, fields="price, name,price", sort="price_asc", per_page=1).get_json()
+    assert body["items"] == [{"price": "10.00", "name": "Zapato"}]
+    assert body["meta"]["next"] is not None
+
+    after = _get(owner, fields="price,name", sort="price_asc", per_page=1, **body["meta"]["next"])
+    assert after.get_json()["items"] == [{"price": "20.00", "name": "Bota"}]
+
+
+@pytest.mark.parametrize("fields", ["name,password", "user_id", "email", ",", "name,__class__"])
+def test_fields_outside_the_whitelist_are_rejected(owner, fields):
+    resp = _get(owner, fields=fields)
+    assert resp.status_code == 400
+    assert resp.get_json()["allowed"] == sorted(API_FIELDS)
+
+
+def test_fields_change_the_etag(owner):
+    _add(owner, "Zapato", "10")
+    first = _get(owner, fields="name")
+    assert _get(owner, fields="name", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+    again = _get(owner, fields="name,price", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 200
+    assert again.get_json()["items"] == [{"name": "Zapato", "price": "10.00"}]
@@ -0,0 +1,151 @@
+"""
+Las consultas calientes (catálogo público con y sin búsqueda, listado del
+dashboard, con y sin cursor) deben resolverse con índices: sin escaneos completos ni ordenamientos
+en memoria. Corre sobre SQLite (EXPLAIN QUERY PLAN); contra MySQL se puede
+apuntar SQLALCHEMY_DATABASE_URI a otra base y mirar EXPLAIN.
+"""
+import random
+
+import pytest
+from sqlalchemy import case, event, insert
+
+from app import db
+from app.models import Product, User
+from app.routes.dashboard import LISTING_ORDER
+from app.routes.public import SORT_KEYS, _catalog_query
+from app.utils.pagination import encode_cursor, keyset_query
+
+PRODUCTS = 2000
+
+
+def _explain(query):
+    conn = db.session.connection()
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+
+    def _rewrite(conn_, cursor, statement, parameters, context, executemany):
+        return prefix + statement, parameters
+
+    event.listen(conn, "before_cursor_execute", _rewrite, retval=True)
+    try:
+        result = conn.execute(query.statement)
+        cols = [d[0] for d in result.cursor.description]
+        rows = [dict(zip(cols, r)) for r in result.cursor.fetchall()]
+        result.close()
+    finally:
+        event.remove(conn, "before_cursor_execute", _rewrite)
+    return rows
+
+
+def _plan_problems(rows, dialect: str) -> list[str]:
+    problems = []
+    for row in rows:
+        if dialect == "sqlite":
+            detail = row.get("detail", "")
+            if detail.startswith("SCAN"):
+                problems.append(f"escaneo completo: {detail}")
+            if "TEMP B-TREE" in detail:
+                problems.append(f"ordenamiento en memoria: {detail}")
+        else:
+            extra = row.get("Extra") or ""
+            if row.get("type") == "ALL":
+                problems.append(f"escaneo completo de {row.get('table')}")
+            if "filesort" in extra:
+                problems.append(f"filesort en {row.get('table')}: {extra}")
+    return problems
+
+
+def _hot_queries(user_id: int) -> dict:
+    """Consultas que construyen store_catalog y dashboard.index, con y sin cursor."""
+    def cursor_for(order):
+        row = Product.query.filter_by(user_id=user_id).first()
+        return encode_cursor([getattr(row, col.key) for col, _ in order])
+
+    version = db.session.get(User, user_id).catalog_version
+    queries = {}
+    for sort, order in SORT_KEYS.items():
+        q, _, _ = _catalog_query(user_id, "", sort)
+        queries[f"catalog sort={sort}"] = keyset_query(q, order, 12)
+        queries[f"catalog sort={sort} after"] = keyset_query(q, order, 12, after=cursor_for(order))
+        queries[f"catalog sort={sort} before"] = keyset_query(q, order, 12, before=cursor_for(order))
+        # Búsqueda: IN sobre los ids del índice (todos los productos) y el mismo orden
+        q, _, _ = _catalog_query(user_id, SEARCH_TEXT, sort, version)
+        queries[f"search sort={sort}"] = keyset_query(q, order, 12)
+        queries[f"search sort={sort} after"] = keyset_query(q, order, 12, after=cursor_for(order))
+
+    q = Product.query.filter_by(user_id=user_id)
+    queries["dashboard listing"] = keyset_query(q, LISTING_ORDER, 10)
+    queries["dashboard listing after"] = keyset_query(q, LISTING_ORDER, 10, after=cursor_for(LISTING_ORDER))
+    queries["dashboard total"] = q.with_entities(db.func.count(Product.id))
+    queries["dashboard available"] = q.filter_by(status='available').with_entities(db.func.count(Product.id))
+    return queries
+
+
+SEARCH_TEXT = "producto"
+
+HOT_QUERY_LABELS = (
+    [f"catalog sort={sort}{suffix}" for sort in SORT_KEYS for suffix in ("", " after", " before")]
+    + [f"search sort={sort}{suffix}" for sort in SORT_KEYS for suffix in ("", " after")]
+    + ["dashboard listing", "dashboard listing after", "dashboard total", "dashboard available"]
+)
+
+
+@pytest.fixture(scope="module")
+def seeded_app(make_app):
+    app = make_app()
+    rnd = random.Random(0)
+    with app.app_context():
+        user = User(username='plan', userlastname='plan', email='plan@example.com',
+                    password='x', store_name='Plan', store_address='-', celphone='0',
+                    subdomain='plan-check', country='-', city='-')
+        db.session.add(user)
+        db.session.flush()
+        rows = [
+            dict(user_id=user.id, name=f'Producto {i}', price=rnd.randint(1, 500),
+                 status=rnd.choice(('available', 'unavailable')))
+            for i in range(PRODUCTS)
+        ]
+        for row in rows:
+            row['effective_price'] = row['price']
+        for i in range(0, len(rows), 1000):
+            db.session.execute(insert(Product), rows[i:i + 1000])
+        db.session.commit()
+        app.config["PLAN_USER_ID"] = user.id
+        db.session.remove()
+    return app
+
+
+@pytest.mark.parametrize("label", HOT_QUERY_LABELS)
+def test_hot_query_uses_index(seeded_app, label):
+    with seeded_app.app_context():
+        query = _hot_queries(seeded_app.config["PLAN_USER_ID"])[label]
+        dialect = db.session.connection().dialect.name
+        assert _plan_problems(_explain(query), dialect) == []
+
+
+def test_search_by_relevance_sorts_only_matches(seeded_app):
+    # ORDER BY posición en el ranking no tiene índice: se ordena en memoria,
+    # pero solo las SEARCH_MAX_RESULTS coincidencias y sin escanear la tabla
+    with seeded_app.app_context():
+        user_id = seeded_app.config["PLAN_USER_ID"]
+        q, sort, ranking = _catalog_query(user_id, SEARCH_TEXT, "relevance",
+                                          db.session.get(User, user_id).catalog_version)
+        assert sort == "relevance" and len(ranking) <= seeded_app.config.get("SEARCH_MAX_RESULTS", 1000)
+        query = q.order_by(case(ranking, value=Product.id), Product.id.desc()).limit(12)
+        problems = _plan_problems(_explain(query), db.session.connection().dialect.name)
+        assert [p for p in problems if not p.startswith("ordenamiento")] == []
+
+
+
+def test_discount_pass_reads_only_todays_windows(seeded_app):
+    # Solo las ventanas que abren o cierran hoy, por los índices de
+    # discount_start / discount_end; no todos los productos
+    from datetime import date
+
+    from app.utils.pricing import stale_products
+
+    with seeded_app.app_context():
+        rows = _explain(stale_products(date.today()))
+        assert _plan_problems(rows, db.session.connection().dialect.name) == []
+        if db.session.connection().dialect.name == "sqlite":
+            details = " ".join(r["detail"] for r in rows)
+            assert "ix_products_discount_start" in details and "ix_products_discount_end" in details
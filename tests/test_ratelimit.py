@@ -0,0 +1,36 @@
+import pytest
+
+from app.utils.ratelimit import limiter
+
+SIGNUP = dict(username="Ana", userlastname="Paz", password="secret1", confirm_password="secret1",
+              store_name="Acme", store_address="Calle 1", celphone="123", country="BO", city="La Paz")
+
+
+@pytest.fixture
+def limited(make_app):
+    app = make_app(RATELIMIT_ENABLED=True, REGISTER_RATE_LIMIT_IP="100/hour",
+                   REGISTER_RATE_LIMIT_EMAIL="1/hour")
+    yield app.test_client()
+    limiter.enabled = False
+
+
+def test_register_limits_each_email(limited):
+    first = limited.post("/auth/register", data=dict(SIGNUP, email="ana@example.com", subdomain="acme"))
+    assert first.status_code == 302
+
+    # Mismo email normalizado desde la misma IP (con balde de sobra): 429
+    again = limited.post("/auth/register", data=dict(SIGNUP, email="Ana@Example.com", subdomain="otra"))
+    assert again.status_code == 429 and "Retry-After" in again.headers
+
+    other = limited.post("/auth/register", data=dict(SIGNUP, email="beto@example.com", subdomain="beto"))
+    assert other.status_code == 302
+    assert limiter.stats()["shed"] == {"register_email": 1}
+
+
+def test_subdomain_check_is_limited(make_app):
+    client = make_app(RATELIMIT_ENABLED=True, SUBDOMAIN_CHECK_RATE_LIMIT_IP="2/minute").test_client()
+    try:
+        codes = [client.get("/auth/subdomain-availability?subdomain=acme").status_code for _ in range(3)]
+    finally:
+        limiter.enabled = False
+    assert codes == [200, 200, 429]
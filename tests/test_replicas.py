@@ -0,0 +1,43 @@
+import time
+
+import pytest
+from flask import g, session
+
+from app.utils.replicas import router
+
+
+@pytest.fixture
+def app(make_app, tmp_path):
+    # Réplica inalcanzable: el directorio no existe
+    return make_app(SQLALCHEMY_REPLICA_URIS=[f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"])
+
+
+def test_replica_error_retries_on_primary(owner):
+    owner.post("/dashboard/products/new", data=dict(name="Zapato", price="10", status="available"))
+    before = router.stats()
+
+    visitor = owner.application.test_client()
+    resp = visitor.get("/public/acme")
+    assert resp.status_code == 200
+    assert b"Zapato" in resp.data
+    stats = router.stats()
+    assert stats["primary_retries"] > before["primary_retries"]
+    assert stats["down"] == ["replica_0"]
+
+
+def test_read_your_writes_uses_own_cookie(owner, app):
+    resp = owner.post("/dashboard/products/new", data=dict(name="Zapato", price="10", status="available"))
+    assert "_db_primary_until=" in resp.headers.get("Set-Cookie", "")
+
+    # El router no toca la sesión de Flask (no añade Vary: Cookie por su cuenta)
+    with app.test_request_context("/public/acme"):
+        flask_session = session._get_current_object()
+        flask_session.accessed = False
+        router.route_to_replica()
+        assert g._db_use_replica
+        assert not flask_session.accessed
+
+    cookie = f"_db_primary_until={int(time.time()) + 60}"
+    with app.test_request_context("/public/acme", headers={"Cookie": cookie}):
+        router.route_to_replica()
+        assert "_db_use_replica" not in g
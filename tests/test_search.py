@@ -0,0 +1,62 @@
+import pytest
+
+from app import db
+from app.models import Product
+from app.utils import store_stats
+from app.utils.search import search_index
+
+
+@pytest.fixture
+def app(make_app):
+    search_index.clear()
+    return make_app(SEARCH_MAX_RESULTS=2)
+
+
+def _names(client, **params):
+    resp = client.get("/public/acme/products.json", query_string=dict(fields="name,price", **params))
+    assert resp.status_code == 200
+    return [item["name"] for item in resp.get_json()["items"]]
+
+
+def _add(client, name, price):
+    client.post("/dashboard/products/new", data=dict(name=name, price=price, status="available"))
+
+
+def test_cap_only_limits_relevance(owner):
+    for name, price in (("Zapato rojo", "30"), ("Zapato azul", "10"), ("Zápato verde", "20")):
+        _add(owner, name, price)
+
+    # Más coincidencias que SEARCH_MAX_RESULTS: entran todas y con las mismas reglas
+    # del índice (sin acentos) que cuando son pocas
+    assert _names(owner, q="zapato", sort="price_asc") == ["Zapato azul", "Zápato verde", "Zapato rojo"]
+    assert len(_names(owner, q="zapato", sort="relevance")) == 2
+
+
+def test_index_follows_catalog_version(owner, app):
+    _add(owner, "Zapato", "10")
+    assert _names(owner, q="zapato") == ["Zapato"]
+
+    # Edición hecha por otro worker: este índice no se enteró, pero la versión cambió
+    with app.app_context():
+        product = db.session.get(Product, 1)
+        product.name = "Bota"
+        store_stats.touch(product.user_id)
+        db.session.commit()
+    assert _names(owner, q="zapato") == []
+    assert _names(owner, q="bota") == ["Bota"]
+
+
+def test_dashboard_edits_update_index_in_place(owner, monkeypatch):
+    _add(owner, "Zapato", "10")
+    assert _names(owner, q="zapato") == ["Zapato"]
+
+    builds = []
+    build = search_index._build
+    monkeypatch.setattr(search_index, "_build", lambda *args: builds.append(args) or build(*args))
+    owner.post("/dashboard/products/1/edit", data=dict(name="Bota", price="10", status="available"))
+    _add(owner, "Sandalia", "5")
+    assert _names(owner, q="bota") == ["Bota"]
+    assert _names(owner, q="sandalia") == ["Sandalia"]
+    owner.post("/dashboard/products/2/delete")
+    assert _names(owner, q="sandalia") == []
+    assert builds == []
@@ -0,0 +1,29 @@
+from app import db
+from app.models import StoreStats
+
+
+def _add(client, name):
+    client.post("/dashboard/products/new", data=dict(name=name, price="10", status="available"))
+
+
+def test_delete_counts_without_stats_row(owner, app):
+    _add(owner, "Zapato")
+    _add(owner, "Bota")
+    with app.app_context():
+        db.session.query(StoreStats).delete()
+        db.session.commit()
+
+    # Sin fila, apply_delta recalcula desde products: el borrado no debe contarse dos veces
+    owner.post("/dashboard/products/1/delete")
+    with app.app_context():
+        stats = db.session.get(StoreStats, 1)
+        assert (stats.total, stats.available) == (1, 1)
+
+
+def test_delete_counts_with_stats_row(owner, app):
+    _add(owner, "Zapato")
+    _add(owner, "Bota")
+    owner.post("/dashboard/products/1/delete")
+    with app.app_context():
+        stats = db.session.get(StoreStats, 1)
+        assert (stats.total, stats.available) == (1, 1)
@@ -0,0 +1,35 @@
+from sqlalchemy import event
+
+from app import db
+from app.models import User
+from app.utils.validators import availability_cache
+
+
+def _add_store(app, subdomain):
+    with app.app_context():
+        db.session.add(User(username="x", userlastname="x", email=f"{subdomain}@example.com",
+                            password="x", store_name=subdomain, store_address="-", celphone="0",
+                            subdomain=subdomain, country="-", city="-"))
+        db.session.commit()
+
+
+def test_taken_subdomain_and_suggestions_in_one_query(owner, app):
+    for subdomain in ("acme-2", "acme-4", "acmex"):
+        _add_store(app, subdomain)
+    availability_cache.clear()
+
+    statements = []
+    with app.app_context():
+        engine = db.engine
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        body = owner.get("/auth/subdomain-availability?subdomain=Acme").get_json()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert body == {"subdomain": "acme", "available": False, "suggestions": ["acme-3", "acme-5", "acme-6"]}
+    assert len([s for s in statements if "usuarios.subdomain" in s]) == 1
+
+    # El rango no se sale del slug: "acm" es prefijo de otras, pero está libre
+    assert owner.get("/auth/subdomain-availability?subdomain=acm").get_json()["available"]
+    assert owner.get("/auth/subdomain-availability?subdomain=acme-3").get_json()["available"]
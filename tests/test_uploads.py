@@ -0,0 +1,39 @@
+import io
+
+import pytest
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+from app.utils.uploads import UploadError, save_image
+
+
+def _png() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (8, 8), "blue").save(buf, "PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def upload_app(make_app, tmp_path):
+    app = make_app(UPLOAD_FOLDER=str(tmp_path), ALLOWED_IMAGE_EXTENSIONS={"png", "jpg"})
+    with app.app_context():
+        yield app
+
+
+def _save(data: bytes) -> str:
+    return save_image(FileStorage(io.BytesIO(data), filename="x.png"), 1)
+
+
+def test_valid_image_is_stored(upload_app, tmp_path):
+    assert _save(_png()).endswith(".png")
+    assert [p.suffix for p in (tmp_path / "1").iterdir()] == [".png"]
+
+
+@pytest.mark.parametrize("data", [
+    _png()[:40],                                  # cortado a la mitad
+    b"\x89PNG\r\n\x1a\n" + b"<?php echo 1; ?>" * 4,  # cabecera válida, resto basura
+])
+def test_undecodable_image_is_rejected(upload_app, tmp_path, data):
+    with pytest.raises(UploadError, match="Formato de imagen no permitido"):
+        _save(data)
+    assert list((tmp_path / "1").iterdir()) == []
@@ -0,0 +1,14 @@
+"""
+Punto de entrada WSGI para producción:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app import create_app
+from config import ProdConfig
+
+from app.utils import templates
+
+app = create_app(config_object=ProdConfig)
+
+# Plantillas calientes compiladas en el maestro; los workers las heredan por fork
+templates.warm_up(app)